@@ -7,19 +7,42 @@ used throughout the evaluation pipeline.
 
 import os
 import argparse
+from functools import cache
 from typing import Dict, Optional
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+# Variables the pipeline can't run without
+REQUIRED_ENV_VARS = ("LANGFUSE_SECRET_KEY", "LANGFUSE_PUBLIC_KEY", "OPENAI_API_KEY", "MONGODB_URI")
+
+# Load environment variables from .env file once; every setting below is read
+# here at import time, so nothing else needs to touch os.environ. Deployments that
+# already provide the required variables (e.g. containers) skip the .env lookup
+if any(os.getenv(name) is None for name in REQUIRED_ENV_VARS):
+    load_dotenv(override=False)
 
 # Langfuse Configuration
 LANGFUSE_SECRET_KEY = os.getenv("LANGFUSE_SECRET_KEY", "")
 LANGFUSE_PUBLIC_KEY = os.getenv("LANGFUSE_PUBLIC_KEY", "")
 LANGFUSE_HOST = os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com")
+# Flush Langfuse after every conversation instead of once per run (useful for debugging)
+LANGFUSE_FLUSH_EACH = os.getenv("RAG_EVAL_FLUSH_EACH", "false").lower() in ("1", "true", "yes")
+# Langfuse queues events and uploads them in batches of up to this many events,
+# or whatever was queued when the interval (in seconds) runs out
+LANGFUSE_FLUSH_AT = int(os.getenv("RAG_EVAL_LANGFUSE_FLUSH_AT", "200"))
+LANGFUSE_FLUSH_INTERVAL = float(os.getenv("RAG_EVAL_LANGFUSE_FLUSH_INTERVAL", "2"))
+# Fraction of answer generation traces logged to Langfuse (0 to 1), picked by trace ID
+LANGFUSE_SAMPLE_RATE = float(os.getenv("RAG_EVAL_LANGFUSE_SAMPLE_RATE", "1.0"))
 
 # OpenAI API Key
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+# OpenAI rate limits for the judge model, shared by all concurrent judge calls
+OPENAI_RPM = int(os.getenv("RAG_EVAL_OPENAI_RPM", "5000"))
+OPENAI_TPM = int(os.getenv("RAG_EVAL_OPENAI_TPM", "450000"))
+# Judge response cache: enabled, read-only, replay or disabled
+JUDGE_CACHE_MODE = os.getenv("RAG_EVAL_CACHE_MODE", "disabled").lower()
+JUDGE_CACHE_PATH = os.getenv("RAG_EVAL_CACHE_PATH", ".rag_eval_cache/judge_responses.sqlite3")
+# File format of the per-conversation report details: csv or parquet
+REPORT_DETAILS_FORMAT = os.getenv("RAG_EVAL_REPORT_FORMAT", "csv").lower()
 
 # MongoDB Connection String
 MONGODB_URI = os.getenv("MONGODB_URI", "")
@@ -40,12 +63,13 @@ DEFAULT_BUSINESS_CONTEXT: Dict[str, str] = {
 }
 
 # Command line argument parsing
-def parse_args() -> argparse.Namespace:
+@cache
+def _build_parser() -> argparse.ArgumentParser:
     """
-    Parse command line arguments for the evaluation pipeline.
+    Build the command line argument parser, once per process.
     
     Returns:
-        Parsed arguments
+        Argument parser for the evaluation pipeline
     """
     parser = argparse.ArgumentParser(description='RAG Evaluation Pipeline')
     parser.add_argument('--guest', action='store_true',
@@ -60,9 +84,21 @@ def parse_args() -> argparse.Namespace:
                       help='Start date for filtering conversations (format: YYYY-MM-DDT00:00:00)')
     parser.add_argument('--end-date', type=str,
                       help='End date for filtering conversations (format: YYYY-MM-DDT00:00:00)')
-    return parser.parse_args()
+    parser.add_argument('--max-concurrent', type=int, default=5,
+                      help='Maximum number of conversations evaluated concurrently (default: 5)')
+    return parser
+
+def parse_args() -> argparse.Namespace:
+    """
+    Parse command line arguments for the evaluation pipeline.
+    
+    Returns:
+        Parsed arguments
+    """
+    return _build_parser().parse_args()
 
 # Initialize environment variables
+@cache
 def init_environment() -> None:
-    """Initialize environment variables for APIs."""
+    """Initialize environment variables for APIs (only the first call does any work)."""
     os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY 
\ No newline at end of file
@@ -6,13 +6,28 @@ This module provides functions to load conversation data from MongoDB.
 
 import logging
 import datetime
-from typing import List, Dict, Any, Optional
-from pymongo import MongoClient
+from itertools import pairwise
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Tuple
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 from pymongo.database import Database
 from pymongo.collection import Collection
 
+from .mongodb import get_client
+
 logger = logging.getLogger(__name__)
 
+# Fields of a message document read while extracting question-answer pairs
+MESSAGE_PROJECTION = {"_id": 1, "conversationId": 1, "role": 1, "content": 1, "createdAt": 1}
+
+# Number of conversations fetched per round trip while iterating the aggregation cursor
+CONVERSATION_BATCH_SIZE = 100
+
+# Conversations are returned as lazily decoded BSON: messages are only decoded
+# field by field when a caller reads them, so unread ObjectIds, dates and
+# contents never become Python objects
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
 def connect_to_mongodb(uri: str, db_name: str) -> Database:
     """
     Connect to MongoDB and return the database object.
@@ -24,18 +39,78 @@ def connect_to_mongodb(uri: str, db_name: str) -> Database:
     Returns:
         MongoDB database object
     """
-    client = MongoClient(uri)
-    return client[db_name]
+    return get_client(uri)[db_name]
 
-def load_conversations(
+def _conversation_pipeline(
+    uri: str,
+    db_name: str,
+    limit: int,
+    use_guest: bool,
+    use_date_filter: bool
+) -> Tuple[Collection, Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Build the aggregation that loads conversations with their sorted messages.
+    
+    Args:
+        uri: MongoDB connection URI
+        db_name: Name of the database to use
+        limit: Maximum number of conversations to load
+        use_guest: Whether to use the Guest_Message_History collection
+        use_date_filter: Whether to filter by current date
+        
+    Returns:
+        Tuple of the message collection, the conversation filter, and the pipeline
+    """
+    db = connect_to_mongodb(uri, db_name)
+    
+    # Determine which collection to use
+    collection_name = "Guest_Message_History" if use_guest else "Message_History"
+    collection = db[collection_name]
+    
+    # Build query
+    query = {}
+    
+    # Add date filter if needed
+    if use_date_filter:
+        today = datetime.datetime.now().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        query["createdAt"] = {"$gte": today}
+    
+    # Select the matching conversation IDs and pull in all of their messages,
+    # sorted by creation time, in a single aggregation round trip
+    pipeline = [
+        {"$match": query},
+        {"$group": {"_id": "$conversationId"}},
+        {"$match": {"_id": {"$ne": None}}},
+        {"$limit": limit},
+        {"$lookup": {
+            "from": collection_name,
+            "let": {"conversation_id": "$_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$conversationId", "$$conversation_id"]}}},
+                {"$sort": {"createdAt": 1}},
+                {"$project": MESSAGE_PROJECTION}
+            ],
+            "as": "messages"
+        }}
+    ]
+    
+    return collection, query, pipeline
+
+def iter_conversations(
     uri: str,
     db_name: str,
     limit: int = 20,
     use_guest: bool = False,
     use_date_filter: bool = True
-) -> List[Dict[str, Any]]:
+) -> Iterator[Dict[str, Any]]:
     """
-    Load conversation data from MongoDB.
+    Stream conversation data from MongoDB.
+    
+    Conversations are yielded as the aggregation cursor delivers them, so callers
+    can start on the first ones before the rest have been fetched. Messages are
+    read-only RawBSONDocument mappings.
     
     Args:
         uri: MongoDB connection URI
@@ -44,88 +119,165 @@ def load_conversations(
         use_guest: Whether to use the Guest_Message_History collection
         use_date_filter: Whether to filter by current date
         
-    Returns:
-        List of conversation data dictionaries
+    Yields:
+        Conversation data dictionaries
     """
     try:
-        db = connect_to_mongodb(uri, db_name)
-        
-        # Determine which collection to use
-        collection_name = "Guest_Message_History" if use_guest else "Message_History"
-        collection = db[collection_name]
-        
-        # Build query
-        query = {}
-        
-        # Add date filter if needed
-        if use_date_filter:
-            today = datetime.datetime.now().replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
-            query["createdAt"] = {"$gte": today}
-        
-        # Get distinct conversation IDs
-        conversation_ids = collection.distinct("conversationId", query)
-        
-        if not conversation_ids:
-            logger.warning(f"No conversation IDs found matching the query: {query}")
-            return []
+        collection, query, pipeline = _conversation_pipeline(uri, db_name, limit, use_guest, use_date_filter)
         
-        # Limit number of conversations
-        conversation_ids = conversation_ids[:limit]
-        
-        # Fetch all messages for the selected conversations
-        all_conversations = []
-        
-        for conv_id in conversation_ids:
-            messages = list(collection.find({"conversationId": conv_id}).sort("createdAt", 1))
+        loaded = 0
+        cursor = collection.with_options(codec_options=RAW_CODEC_OPTIONS).aggregate(
+            pipeline, allowDiskUse=True, batchSize=CONVERSATION_BATCH_SIZE
+        )
+        for group in cursor:
+            messages = group["messages"]
             
             if messages:
                 conversation = {
-                    "conversationId": conv_id,
+                    "conversationId": group["_id"],
                     "messages": messages,
                     "messageCount": len(messages),
                     "startTime": messages[0].get("createdAt"),
                     "endTime": messages[-1].get("createdAt")
                 }
-                all_conversations.append(conversation)
+                loaded += 1
+                yield conversation
         
-        return all_conversations
+        if not loaded:
+            logger.warning(f"No conversation IDs found matching the query: {query}")
         
     except Exception as e:
         logger.error(f"Error loading conversations from MongoDB: {e}")
         raise
 
-def extract_questions_and_answers(conversations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def load_conversations(
+    uri: str,
+    db_name: str,
+    limit: int = 20,
+    use_guest: bool = False,
+    use_date_filter: bool = True
+) -> List[Dict[str, Any]]:
     """
-    Extract question-answer pairs from conversations.
+    Load conversation data from MongoDB.
     
     Args:
-        conversations: List of conversation data
+        uri: MongoDB connection URI
+        db_name: Name of the database to use
+        limit: Maximum number of conversations to load
+        use_guest: Whether to use the Guest_Message_History collection
+        use_date_filter: Whether to filter by current date
         
     Returns:
-        List of question-answer pairs
+        List of conversation data dictionaries
     """
-    qa_pairs = []
+    return list(iter_conversations(uri, db_name, limit, use_guest, use_date_filter))
+
+def iter_questions_and_answers(conversations: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily extract question-answer pairs from conversations.
     
+    Args:
+        conversations: Iterable of conversation data, e.g. from iter_conversations
+        
+    Yields:
+        Question-answer pairs
+    """
     for conversation in conversations:
         messages = conversation.get("messages", [])
         conv_id = conversation.get("conversationId")
         
-        # Process messages to extract Q&A pairs
-        for i in range(len(messages) - 1):
-            current_msg = messages[i]
-            next_msg = messages[i + 1]
-            
-            # Check if this is a user message followed by an assistant message
-            if current_msg.get("role") == "user" and next_msg.get("role") == "assistant":
-                qa_pair = {
+        # Every user message directly followed by an assistant message is a Q&A pair
+        yield from (
+            {
+                "conversationId": conv_id,
+                "question": current_msg.get("content", ""),
+                "answer": next_msg.get("content", ""),
+                "timestamp": current_msg.get("createdAt"),
+                "message_id": current_msg.get("_id")
+            }
+            for current_msg, next_msg in pairwise(messages)
+            if current_msg.get("role") == "user" and next_msg.get("role") == "assistant"
+        )
+
+def iter_questions_and_answers_from_mongodb(
+    uri: str,
+    db_name: str,
+    limit: int = 20,
+    use_guest: bool = False,
+    use_date_filter: bool = True
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream question-answer pairs extracted by MongoDB itself.
+    
+    Equivalent to iter_questions_and_answers(iter_conversations(...)), but the
+    user/assistant pairing runs in the aggregation, so only the pairs are sent
+    over the wire instead of every message.
+    
+    Args:
+        uri: MongoDB connection URI
+        db_name: Name of the database to use
+        limit: Maximum number of conversations to load
+        use_guest: Whether to use the Guest_Message_History collection
+        use_date_filter: Whether to filter by current date
+        
+    Yields:
+        Question-answer pairs
+    """
+    try:
+        collection, _, pipeline = _conversation_pipeline(uri, db_name, limit, use_guest, use_date_filter)
+        
+        # Walk the message indexes and keep each user message directly followed
+        # by an assistant message
+        pipeline += [
+            {"$project": {"qa": {"$reduce": {
+                "input": {"$range": [0, {"$max": [0, {"$subtract": [{"$size": "$messages"}, 1]}]}]},
+                "initialValue": [],
+                "in": {"$let": {
+                    "vars": {
+                        "cur": {"$arrayElemAt": ["$messages", "$$this"]},
+                        "nxt": {"$arrayElemAt": ["$messages", {"$add": ["$$this", 1]}]}
+                    },
+                    "in": {"$cond": [
+                        {"$and": [{"$eq": ["$$cur.role", "user"]}, {"$eq": ["$$nxt.role", "assistant"]}]},
+                        {"$concatArrays": ["$$value", [{
+                            "question": "$$cur.content",
+                            "answer": "$$nxt.content",
+                            "timestamp": "$$cur.createdAt",
+                            "message_id": "$$cur._id"
+                        }]]},
+                        "$$value"
+                    ]}
+                }}
+            }}}}
+        ]
+        
+        cursor = collection.aggregate(pipeline, allowDiskUse=True, batchSize=CONVERSATION_BATCH_SIZE)
+        for group in cursor:
+            conv_id = group["_id"]
+            # Fields missing on a message are left out by the server
+            yield from (
+                {
                     "conversationId": conv_id,
-                    "question": current_msg.get("content", ""),
-                    "answer": next_msg.get("content", ""),
-                    "timestamp": current_msg.get("createdAt"),
-                    "message_id": current_msg.get("_id")
+                    "question": qa.get("question", ""),
+                    "answer": qa.get("answer", ""),
+                    "timestamp": qa.get("timestamp"),
+                    "message_id": qa.get("message_id")
                 }
-                qa_pairs.append(qa_pair)
+                for qa in group["qa"]
+            )
+        
+    except Exception as e:
+        logger.error(f"Error loading question-answer pairs from MongoDB: {e}")
+        raise
+
+def extract_questions_and_answers(conversations: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Extract question-answer pairs from conversations.
     
-    return qa_pairs 
\ No newline at end of file
+    Args:
+        conversations: List of conversation data
+        
+    Returns:
+        List of question-answer pairs
+    """
+    return list(iter_questions_and_answers(conversations)) 
\ No newline at end of file
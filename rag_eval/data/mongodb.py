@@ -5,37 +5,290 @@ This module handles all interactions with MongoDB to retrieve conversation data
 for evaluation.
 """
 
-from typing import Dict, List, Optional
+import asyncio
+import logging
+from collections import OrderedDict
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
-from pymongo import MongoClient
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo import ASCENDING, MongoClient
+from pymongo.errors import BulkWriteError, OperationFailure
 
 from ..config.settings import MONGODB_URI, MONGODB_DB_NAME
 
-async def load_data_from_mongodb(
+logger = logging.getLogger(__name__)
+
+# Number of chats whose SearchChunks documents are fetched together
+CHAT_BATCH_SIZE = 50
+
+# Maximum number of users whose business context lookups are kept in memory
+BUSINESS_CONTEXT_CACHE_SIZE = 1024
+
+# In-flight or completed business context lookups keyed by (user_id, guest_mode),
+# kept in least-recently-used order
+_business_context_cache: "OrderedDict[Tuple[str, bool], asyncio.Future]" = OrderedDict()
+
+# Connection pool settings for the shared synchronous MongoDB client
+MONGODB_MAX_POOL_SIZE = 50
+MONGODB_MIN_POOL_SIZE = 5
+MONGODB_MAX_IDLE_TIME_MS = 60000
+
+# The async client multiplexes many coroutines over few sockets, so it needs a
+# much smaller pool than the threaded sync client
+MONGODB_ASYNC_MAX_POOL_SIZE = 10
+
+# Fields of a chat document read while building conversations. Each message's
+# aiResponse array is cut down to its GPT entries on the server; a plain
+# projection can't filter an array nested inside the messages array
+CHAT_PROJECTION = {
+    "chat_id": 1,
+    "userId": 1,
+    "created_at": 1,
+    "messages": {"$map": {
+        "input": {"$ifNull": ["$messages", []]},
+        "as": "message",
+        "in": {
+            "query": "$$message.query",
+            "aiResponse": {"$map": {
+                "input": {"$filter": {
+                    "input": {"$ifNull": ["$$message.aiResponse", []]},
+                    "as": "response",
+                    "cond": {"$eq": ["$$response.type", "GPT"]}
+                }},
+                "as": "response",
+                "in": {"type": "$$response.type", "content": "$$response.content"}
+            }},
+            "retrievedChunks": {"$map": {
+                "input": "$$message.retrievedChunks",
+                "as": "chunk",
+                "in": {"text": "$$chunk.text"}
+            }},
+            "chunksReference": "$$message.chunksReference",
+            "messageid": "$$message.messageid",
+            "aiResponseMessageid": "$$message.aiResponseMessageid",
+            "created_at": "$$message.created_at"
+        }
+    }}
+}
+
+@lru_cache(maxsize=None)
+def get_client(uri: str = MONGODB_URI) -> MongoClient:
+    """
+    Get the shared MongoDB client for a connection string.
+    
+    The client is created on first use and reused afterwards so its connection
+    pool stays warm instead of paying the connect/auth handshake on every call.
+    
+    Args:
+        uri: MongoDB connection string
+        
+    Returns:
+        Cached MongoClient instance
+    """
+    return MongoClient(
+        uri,
+        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+        minPoolSize=MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS
+    )
+
+@lru_cache(maxsize=None)
+def get_async_client(uri: str = MONGODB_URI) -> AsyncIOMotorClient:
+    """
+    Get the shared async (Motor) MongoDB client for a connection string.
+    
+    Used by the async functions in this module so MongoDB I/O doesn't block the
+    event loop.
+    
+    Args:
+        uri: MongoDB connection string
+        
+    Returns:
+        Cached AsyncIOMotorClient instance
+    """
+    return AsyncIOMotorClient(
+        uri,
+        maxPoolSize=MONGODB_ASYNC_MAX_POOL_SIZE,
+        maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS
+    )
+
+async def ensure_indexes(guest_mode: bool = False) -> None:
+    """
+    Create the indexes backing the pipeline's MongoDB queries if they are missing.
+    
+    Covers the created_at date range and business context lookups (root level
+    and inside messages) on the chat history, the per-conversation message scan
+    of the sync loader, and the aiResponseMessageid lookup on SearchChunks.
+    Creating an existing index is a no-op.
+    
+    Args:
+        guest_mode: Whether to index Guest_Message_History instead of Message_History
+    """
+    try:
+        client = get_async_client()
+        db = client[MONGODB_DB_NAME]
+        
+        collection_name = "Guest_Message_History" if guest_mode else "Message_History"
+        collection = db[collection_name]
+        
+        await asyncio.gather(
+            collection.create_index([("created_at", ASCENDING)]),
+            collection.create_index([("conversationId", ASCENDING), ("createdAt", ASCENDING)]),
+            collection.create_index(
+                [("userId", ASCENDING)],
+                partialFilterExpression={"businessContext": {"$exists": True}}
+            ),
+            collection.create_index(
+                [("userId", ASCENDING), ("messages.businessContext", ASCENDING)],
+                sparse=True
+            ),
+            db["SearchChunks"].create_index([("aiResponseMessageid", ASCENDING)])
+        )
+        
+    except Exception as e:
+        # Missing indexes only slow queries down, so keep going without them
+        logger.error("Error creating MongoDB indexes: %s", e)
+
+@lru_cache(maxsize=1)
+def _default_date_window() -> Tuple[datetime, datetime]:
+    """
+    Get the default evaluation window: the 7 days before today (for weekly runs on Sunday).
+    
+    Computed once per process, since each run is a single cron invocation.
+    
+    Returns:
+        Tuple of the window start (inclusive) and end (exclusive), both at midnight
+    """
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=7), today
+
+@lru_cache(maxsize=32)
+def _parse_date_window(start_date: str, end_date: str) -> Tuple[datetime, datetime]:
+    """
+    Parse a custom evaluation window.
+    
+    Args:
+        start_date: Window start (format: YYYY-MM-DDT00:00:00)
+        end_date: Window end (format: YYYY-MM-DDT00:00:00)
+        
+    Returns:
+        Tuple of the window start (inclusive) and end (exclusive)
+        
+    Raises:
+        ValueError: If either date can't be parsed
+    """
+    return datetime.fromisoformat(start_date), datetime.fromisoformat(end_date)
+
+def _chunk_texts(chunks: List[Dict]) -> List[str]:
+    """Extract the text of each stored chunk."""
+    return [chunk.get("text", "") for chunk in chunks]
+
+def _iter_answered_messages(chat: Dict) -> Iterator[Tuple[Dict, str, str]]:
+    """
+    Yield the messages of a chat that have both a query and a GPT answer.
+    
+    Args:
+        chat: Chat document from the message history collection
+        
+    Yields:
+        Tuples of (message, query, answer)
+    """
+    for message in chat.get("messages", []):
+        # Skip if no query or aiResponseMessageid
+        if not message.get("query") or not message.get("aiResponseMessageid"):
+            continue
+        
+        # The query only returns the GPT entries of the aiResponse array, so the
+        # first one is the answer
+        gpt_responses = message.get("aiResponse")
+        answer = gpt_responses[0].get("content") if gpt_responses else None
+        
+        # Skip if no answer found
+        if not answer:
+            continue
+        
+        yield message, message.get("query"), answer
+
+async def _fetch_search_chunks(
+    chunks_collection: AsyncIOMotorCollection,
+    chunk_refs: Set,
+    chunk_keys: Set[Tuple]
+) -> Tuple[Dict, Dict[Tuple, List[str]]]:
+    """
+    Fetch the SearchChunks documents for many messages with a single query.
+    
+    Documents referenced by _id and documents matched by message key are
+    requested together in one $or query and sorted out afterwards.
+    
+    Args:
+        chunks_collection: The SearchChunks collection
+        chunk_refs: SearchChunks _id values referenced by messages
+        chunk_keys: (query, chat_id, aiResponseMessageid) keys of messages without a reference
+        
+    Returns:
+        Tuple of chunk texts keyed by _id and chunk texts keyed by (query, chat_id, aiResponseMessageid)
+    """
+    chunks_by_ref = {}
+    chunks_by_key = {}
+    
+    conditions = []
+    if chunk_refs:
+        conditions.append({"_id": {"$in": list(chunk_refs)}})
+    if chunk_keys:
+        conditions.append({"aiResponseMessageid": {"$in": list({key[2] for key in chunk_keys})}})
+    if not conditions:
+        return chunks_by_ref, chunks_by_key
+    
+    chunks_docs = chunks_collection.find(
+        {"$or": conditions},
+        {"query": 1, "chat_id": 1, "aiResponseMessageid": 1, "chunks.text": 1}
+    )
+    async for chunks_doc in chunks_docs:
+        if "chunks" not in chunks_doc:
+            continue
+        
+        # A document may answer both a reference and a key lookup
+        if chunks_doc["_id"] in chunk_refs:
+            chunks_by_ref[chunks_doc["_id"]] = _chunk_texts(chunks_doc["chunks"])
+        
+        key = (chunks_doc.get("query"), chunks_doc.get("chat_id"), chunks_doc.get("aiResponseMessageid"))
+        # Keep the first matching document, like find_one would
+        if key in chunk_keys and key not in chunks_by_key:
+            chunks_by_key[key] = _chunk_texts(chunks_doc["chunks"])
+    
+    return chunks_by_ref, chunks_by_key
+
+async def iter_data_from_mongodb(
     limit: int = 50, 
     guest_mode: bool = False, 
     date_filter: bool = True,
     start_date: str = None,
     end_date: str = None
-) -> List[Dict]:
+) -> AsyncIterator[Dict]:
     """
-    Load real user queries, answers, and chunks from MongoDB for evaluation.
+    Stream real user queries, answers, and chunks from MongoDB for evaluation.
+    
+    Conversations are yielded as the chats cursor is consumed, so processing can
+    start before all of them have been loaded.
     
     Args:
-        limit: Maximum number of conversations to load
+        limit: Maximum number of chats to load
         guest_mode: Whether to load from guest chat history
         date_filter: Whether to filter conversations by current date
         start_date: Optional custom start date for filtering (format: YYYY-MM-DDT00:00:00)
         end_date: Optional custom end date for filtering (format: YYYY-MM-DDT00:00:00)
         
-    Returns:
-        List of dictionaries containing query, answer, chunks, and metadata
+    Yields:
+        Dictionaries containing query, answer, chunks, and metadata
     """
+    loaded = 0
     try:
         # Connect to MongoDB using the provided connection string
-        print(f"Connecting to MongoDB (guest mode: {guest_mode}, limit: {limit}, date_filter: {date_filter})")
+        logger.debug("Connecting to MongoDB (guest mode: %s, limit: %s, date_filter: %s)", guest_mode, limit, date_filter)
         
-        client = MongoClient(MONGODB_URI)
+        client = get_async_client()
         
         db = client[MONGODB_DB_NAME]
         
@@ -45,8 +298,6 @@ async def load_data_from_mongodb(
         
         # Query for conversations with the necessary data
         # We need messages with both a query and a response
-        conversations = []
-        
         # Create date filter for the last week if needed
         query_filter = {"messages": {"$exists": True}}
         if date_filter:
@@ -54,83 +305,96 @@ async def load_data_from_mongodb(
             if start_date and end_date:
                 # Parse the provided date strings
                 try:
-                    start_date_obj = datetime.fromisoformat(start_date)
-                    end_date_obj = datetime.fromisoformat(end_date)
-                    
-                    # Add date filter to query
-                    query_filter["created_at"] = {"$gte": start_date_obj, "$lt": end_date_obj}
-                    print(f"Filtering conversations from {start_date} to {end_date}")
+                    window_start, window_end = _parse_date_window(start_date, end_date)
+                    logger.info("Filtering conversations from %s to %s", start_date, end_date)
                 except ValueError as e:
-                    print(f"Error parsing custom dates: {e}. Using default date filter.")
+                    logger.warning("Error parsing custom dates: %s. Using default date filter.", e)
                     # Fall back to default date filter
-                    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-                    week_ago = today - timedelta(days=7)
-                    query_filter["created_at"] = {"$gte": week_ago, "$lt": today}
-                    print(f"Filtering conversations from {week_ago.isoformat()} to {today.isoformat()}")
+                    window_start, window_end = _default_date_window()
+                    logger.info("Filtering conversations from %s to %s", window_start.isoformat(), window_end.isoformat())
             else:
-                # Get today's date with time set to midnight
-                today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-                
-                # Calculate the date for 7 days ago (for weekly runs on Sunday)
-                week_ago = today - timedelta(days=7)
-                
-                # Add date filter to query
-                query_filter["created_at"] = {"$gte": week_ago, "$lt": today}
-                print(f"Filtering conversations from {week_ago.isoformat()} to {today.isoformat()}")
+                window_start, window_end = _default_date_window()
+                logger.info("Filtering conversations from %s to %s", window_start.isoformat(), window_end.isoformat())
+            
+            # Add date filter to query
+            query_filter["created_at"] = {"$gte": window_start, "$lt": window_end}
         
         # Find chats with queries and responses
-        chats = collection.find(
-            query_filter,
-            {"chat_id": 1, "userId": 1, "messages": 1, "created_at": 1}
-        ).limit(limit)
-        
-        for chat in chats:
-            chat_id = chat.get("chat_id")
-            user_id = chat.get("userId", "guest")
+        aggregate_options = {"batchSize": CHAT_BATCH_SIZE}
+        if "created_at" in query_filter:
+            # Pin the date range to the created_at index created by ensure_indexes
+            aggregate_options["hint"] = [("created_at", ASCENDING)]
+        pipeline = [{"$match": query_filter}, {"$limit": limit}, {"$project": CHAT_PROJECTION}]
+        
+        # Read the (limit-bounded) chats up front so the cursor is exhausted and
+        # closed before the slower chunk lookups and downstream evaluation start
+        try:
+            chats = await collection.aggregate(pipeline, **aggregate_options).to_list(length=limit)
+        except OperationFailure as e:
+            if "hint" not in aggregate_options:
+                raise
+            # ensure_indexes may not have been able to create the index, e.g. for a
+            # read-only user; the query still works without it, just slower
+            logger.warning("Hinted chat query failed (%s); retrying without the index hint", e)
+            del aggregate_options["hint"]
+            chats = await collection.aggregate(pipeline, **aggregate_options).to_list(length=limit)
+        
+        chunks_collection = db["SearchChunks"]
+        
+        # Chunks already looked up in earlier batches, including misses, so messages
+        # repeating a reference or (query, chat_id, aiResponseMessageid) key are
+        # never sent to SearchChunks twice
+        chunks_by_ref = {}
+        chunks_by_key = {}
+        
+        # Work through the chats in batches so the SearchChunks documents for a whole
+        # batch are fetched with one bulk query instead of one query per message.
+        # Each batch is taken off the list so its chats can be freed once the
+        # consumer is done with the conversations built from them
+        while chats:
+            chat_batch = chats[:CHAT_BATCH_SIZE]
+            del chats[:CHAT_BATCH_SIZE]
             
-            # Process each message in the chat
-            for message in chat.get("messages", []):
-                # Skip if no query or aiResponseMessageid
-                if not message.get("query") or not message.get("aiResponseMessageid"):
-                    continue
-                
-                query = message.get("query")
-                
-                # Find GPT response in the aiResponse array
-                answer = None
-                for response in message.get("aiResponse", []):
-                    if response.get("type") == "GPT":
-                        answer = response.get("content")
-                        break
-                
-                # Skip if no answer found
-                if not answer:
-                    continue
+            # First pass: collect the answered messages and the chunks they need
+            entries = []
+            chunk_refs = set()
+            chunk_keys = set()
+            for chat in chat_batch:
+                chat_id = chat.get("chat_id")
+                for message, query, answer in _iter_answered_messages(chat):
+                    entries.append((chat, message, query, answer))
+                    
+                    # Messages carrying retrievedChunks don't need a lookup
+                    if message.get("retrievedChunks"):
+                        continue
+                    if message.get("chunksReference"):
+                        if message["chunksReference"] not in chunks_by_ref:
+                            chunk_refs.add(message["chunksReference"])
+                    else:
+                        key = (query, chat_id, message.get("aiResponseMessageid"))
+                        if key not in chunks_by_key:
+                            chunk_keys.add(key)
+            
+            fetched_by_ref, fetched_by_key = await _fetch_search_chunks(chunks_collection, chunk_refs, chunk_keys)
+            # Remember misses as None so they aren't looked up again either
+            chunks_by_ref.update(dict.fromkeys(chunk_refs))
+            chunks_by_ref.update(fetched_by_ref)
+            chunks_by_key.update(dict.fromkeys(chunk_keys))
+            chunks_by_key.update(fetched_by_key)
+            
+            # Second pass: assemble the conversations from the fetched chunks
+            for chat, message, query, answer in entries:
+                chat_id = chat.get("chat_id")
                 
                 # First check for retrievedChunks directly in the message
-                chunks = []
                 if message.get("retrievedChunks"):
-                    chunks = [chunk.get("text", "") for chunk in message.get("retrievedChunks", [])]
+                    chunks = _chunk_texts(message["retrievedChunks"])
+                elif message.get("chunksReference"):
+                    # Use direct reference to chunks document
+                    chunks = chunks_by_ref[message["chunksReference"]] or []
                 else:
-                    # If not found, check if there are chunks in chunks_reference
-                    chunks_reference = message.get("chunksReference")
-                    
-                    if chunks_reference:
-                        # Use direct reference to chunks document
-                        chunks_collection = db["SearchChunks"]
-                        chunks_doc = chunks_collection.find_one({"_id": chunks_reference})
-                        if chunks_doc and "chunks" in chunks_doc:
-                            chunks = [chunk.get("text", "") for chunk in chunks_doc.get("chunks", [])]
-                    else:
-                        # Try to find chunks by query and chat_id
-                        chunks_collection = db["SearchChunks"]
-                        chunks_doc = chunks_collection.find_one({
-                            "query": query,
-                            "chat_id": chat_id,
-                            "aiResponseMessageid": message.get("aiResponseMessageid")
-                        })
-                        if chunks_doc and "chunks" in chunks_doc:
-                            chunks = [chunk.get("text", "") for chunk in chunks_doc.get("chunks", [])]
+                    # Otherwise use the chunks found by query and chat_id
+                    chunks = chunks_by_key[(query, chat_id, message.get("aiResponseMessageid"))] or []
                 
                 # Create conversation entry
                 conversation = {
@@ -139,20 +403,98 @@ async def load_data_from_mongodb(
                     "chunks": chunks,
                     "created_at": message.get("created_at", chat.get("created_at", datetime.now())).isoformat(),
                     "chat_id": chat_id,
-                    "user_id": user_id,
+                    "user_id": chat.get("userId", "guest"),
                     "message_id": message.get("messageid"),
                     "aiResponseMessageid": message.get("aiResponseMessageid")
                 }
                 
-                conversations.append(conversation)
+                loaded += 1
+                yield conversation
         
-        print(f"Loaded {len(conversations)} conversations from MongoDB")
-        return conversations
+        logger.info("Loaded %d conversations from MongoDB", loaded)
     
     except Exception as e:
-        print(f"Error loading data from MongoDB: {e}")
-        # Return empty list if MongoDB loading fails
-        return [] 
+        # Stop streaming if MongoDB loading fails
+        logger.error("Error loading data from MongoDB: %s", e)
+
+async def load_data_from_mongodb(
+    limit: int = 50, 
+    guest_mode: bool = False, 
+    date_filter: bool = True,
+    start_date: str = None,
+    end_date: str = None
+) -> List[Dict]:
+    """
+    Load real user queries, answers, and chunks from MongoDB for evaluation.
+    
+    Args:
+        limit: Maximum number of conversations to load
+        guest_mode: Whether to load from guest chat history
+        date_filter: Whether to filter conversations by current date
+        start_date: Optional custom start date for filtering (format: YYYY-MM-DDT00:00:00)
+        end_date: Optional custom end date for filtering (format: YYYY-MM-DDT00:00:00)
+        
+    Returns:
+        List of dictionaries containing query, answer, chunks, and metadata
+    """
+    return [
+        conversation async for conversation in iter_data_from_mongodb(
+            limit=limit,
+            guest_mode=guest_mode,
+            date_filter=date_filter,
+            start_date=start_date,
+            end_date=end_date
+        )
+    ]
+
+def build_evaluation_document(
+    evaluation_data: Dict, 
+    chat_id: str,
+    message_id: str,
+    aiResponseMessageid: str,
+    guest_mode: bool = False,
+    query: str = None,
+    chunks: List[str] = None,
+    answer: str = None
+) -> Dict:
+    """
+    Build the RAG_Evaluations document for an evaluation.
+    
+    Args:
+        evaluation_data: Dictionary containing all evaluation metrics and judgments
+        chat_id: The chat ID associated with the evaluation
+        message_id: The message ID associated with the evaluation
+        aiResponseMessageid: The AI response message ID
+        guest_mode: Whether this is from guest chat history
+        query: The original user query
+        chunks: The retrieved document chunks used for answering
+        answer: The generated answer
+        
+    Returns:
+        Document ready to be inserted into the RAG_Evaluations collection
+    """
+    return {
+        "chat_id": chat_id,
+        "message_id": message_id,
+        "aiResponseMessageid": aiResponseMessageid,
+        "guest_mode": guest_mode,
+        "evaluation_date": datetime.now(),
+        "query": query,
+        "chunks": chunks,
+        "answer": answer,
+        "evaluation_results": evaluation_data,
+        # Add top-level fields for easier querying
+        "accuracy_score": evaluation_data.get("accuracy", {}).get("score"),
+        "relevance_score": evaluation_data.get("relevance", {}).get("score"),
+        "coherence_score": evaluation_data.get("coherence", {}).get("score"),
+        "business_context_score": evaluation_data.get("business_context", {}).get("score"),
+        "factual_accuracy_score": evaluation_data.get("factual_accuracy", {}).get("score"),
+        "accuracy_judgment": evaluation_data.get("accuracy", {}).get("judgment"),
+        "relevance_judgment": evaluation_data.get("relevance", {}).get("judgment"),
+        "coherence_judgment": evaluation_data.get("coherence", {}).get("judgment"),
+        "business_context_judgment": evaluation_data.get("business_context", {}).get("judgment"),
+        "factual_accuracy_judgment": evaluation_data.get("factual_accuracy", {}).get("judgment")
+    }
 
 async def save_evaluation_to_mongodb(
     evaluation_data: Dict, 
@@ -180,47 +522,58 @@ async def save_evaluation_to_mongodb(
     Returns:
         Boolean indicating success or failure
     """
+    evaluation_doc = build_evaluation_document(
+        evaluation_data,
+        chat_id,
+        message_id,
+        aiResponseMessageid,
+        guest_mode,
+        query=query,
+        chunks=chunks,
+        answer=answer
+    )
+    return bool(await save_evaluations_to_mongodb([evaluation_doc]))
+
+async def save_evaluations_to_mongodb(docs: List[Dict]) -> List[ObjectId]:
+    """
+    Save many RAG evaluation documents to MongoDB in a single bulk insert.
+    
+    The insert is unordered, so one failing document doesn't stop the rest of
+    the batch from being written.
+    
+    Args:
+        docs: Documents as built by build_evaluation_document
+        
+    Returns:
+        List of the inserted document IDs
+    """
+    if not docs:
+        return []
+    
     try:
         # Connect to MongoDB
-        client = MongoClient(MONGODB_URI)
+        client = get_async_client()
         db = client[MONGODB_DB_NAME]
         
         # Use a dedicated collection for evaluations
         collection = db["RAG_Evaluations"]
         
-        # Prepare the document to insert
-        evaluation_doc = {
-            "chat_id": chat_id,
-            "message_id": message_id,
-            "aiResponseMessageid": aiResponseMessageid,
-            "guest_mode": guest_mode,
-            "evaluation_date": datetime.now(),
-            "query": query,
-            "chunks": chunks,
-            "answer": answer,
-            "evaluation_results": evaluation_data,
-            # Add top-level fields for easier querying
-            "accuracy_score": evaluation_data.get("accuracy", {}).get("score"),
-            "relevance_score": evaluation_data.get("relevance", {}).get("score"),
-            "coherence_score": evaluation_data.get("coherence", {}).get("score"),
-            "business_context_score": evaluation_data.get("business_context", {}).get("score"),
-            "factual_accuracy_score": evaluation_data.get("factual_accuracy", {}).get("score"),
-            "accuracy_judgment": evaluation_data.get("accuracy", {}).get("judgment"),
-            "relevance_judgment": evaluation_data.get("relevance", {}).get("judgment"),
-            "coherence_judgment": evaluation_data.get("coherence", {}).get("judgment"),
-            "business_context_judgment": evaluation_data.get("business_context", {}).get("judgment"),
-            "factual_accuracy_judgment": evaluation_data.get("factual_accuracy", {}).get("judgment")
-        }
+        result = await collection.insert_many(docs, ordered=False)
         
-        # Insert the document
-        result = collection.insert_one(evaluation_doc)
+        logger.info("Saved %d evaluations to MongoDB", len(result.inserted_ids))
+        return result.inserted_ids
         
-        print(f"Saved evaluation to MongoDB with ID: {result.inserted_id}")
-        return True
+    except BulkWriteError as e:
+        # The driver assigns _id values before sending, so the successful
+        # inserts are every document without a write error
+        failed = {error["index"] for error in e.details.get("writeErrors", [])}
+        inserted_ids = [doc["_id"] for index, doc in enumerate(docs) if index not in failed]
+        logger.error("Error saving %d of %d evaluations to MongoDB: %s", len(failed), len(docs), e)
+        return inserted_ids
         
     except Exception as e:
-        print(f"Error saving evaluation to MongoDB: {e}")
-        return False 
+        logger.error("Error saving evaluations to MongoDB: %s", e)
+        return []
 
 async def get_business_context_from_mongodb(user_id: str, guest_mode: bool = False) -> Optional[Dict]:
     """
@@ -235,7 +588,7 @@ async def get_business_context_from_mongodb(user_id: str, guest_mode: bool = Fal
     """
     try:
         # Connect to MongoDB
-        client = MongoClient(MONGODB_URI)
+        client = get_async_client()
         db = client[MONGODB_DB_NAME]
         
         # Select collection based on guest_mode
@@ -244,7 +597,7 @@ async def get_business_context_from_mongodb(user_id: str, guest_mode: bool = Fal
         
         # Query for the user's business context
         # First try to find a document with businessContext at the root level
-        result = collection.find_one(
+        result = await collection.find_one(
             {"userId": user_id, "businessContext": {"$exists": True}},
             {"businessContext": 1, "_id": 0}
         )
@@ -254,21 +607,137 @@ async def get_business_context_from_mongodb(user_id: str, guest_mode: bool = Fal
             return result["businessContext"]
             
         # If not found at root level, check for businessContext in messages
-        # This handles the case where businessContext might be stored in a message
-        result = collection.find_one(
-            {"userId": user_id, "messages.businessContext": {"$exists": True}},
-            {"messages.businessContext": 1, "_id": 0}
-        )
+        # This handles the case where businessContext might be stored in a message.
+        # Only the first message carrying one is sent back, not the whole array
+        results = collection.aggregate([
+            {"$match": {"userId": user_id, "messages.businessContext": {"$exists": True}}},
+            {"$limit": 1},
+            {"$unwind": "$messages"},
+            {"$match": {"messages.businessContext": {"$exists": True}}},
+            {"$limit": 1},
+            {"$project": {"_id": 0, "businessContext": "$messages.businessContext"}}
+        ])
         
-        if result and "messages" in result:
-            # Find the first message with business context
-            for message in result["messages"]:
-                if "businessContext" in message:
-                    return message["businessContext"]
+        async for result in results:
+            return result["businessContext"]
         
         # No business context found
         return None
         
     except Exception as e:
-        print(f"Error retrieving business context from MongoDB: {e}")
-        return None 
\ No newline at end of file
+        logger.error("Error retrieving business context from MongoDB: %s", e)
+        return None
+
+async def get_cached_business_context(user_id: str, guest_mode: bool = False) -> Optional[Dict]:
+    """
+    Retrieve the business context for a user, reusing earlier lookups.
+    
+    Concurrent and repeated requests for the same user share a single MongoDB
+    lookup. The cache keeps the most recently used BUSINESS_CONTEXT_CACHE_SIZE users.
+    
+    Args:
+        user_id: The user ID to retrieve business context for
+        guest_mode: Whether to use Guest_Message_History collection
+        
+    Returns:
+        Dictionary containing the business context or None if not found
+    """
+    key = (user_id, guest_mode)
+    task = _business_context_cache.get(key)
+    
+    if task is None:
+        task = asyncio.ensure_future(get_business_context_from_mongodb(user_id, guest_mode))
+        _business_context_cache[key] = task
+        if len(_business_context_cache) > BUSINESS_CONTEXT_CACHE_SIZE:
+            _business_context_cache.popitem(last=False)
+    else:
+        _business_context_cache.move_to_end(key)
+    
+    return await task
+
+async def get_business_contexts_bulk(user_ids: Iterable[str], guest_mode: bool = False) -> Optional[Dict[str, Dict]]:
+    """
+    Retrieve the business contexts for many users with a single MongoDB query.
+    
+    Applies the same precedence as get_business_context_from_mongodb: a root-level
+    businessContext wins over one stored inside a message.
+    
+    Args:
+        user_ids: The user IDs to retrieve business contexts for
+        guest_mode: Whether to use Guest_Message_History collection
+        
+    Returns:
+        Dictionary mapping user IDs to their business context; users without one are
+        omitted. None if the query failed
+    """
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return {}
+    
+    try:
+        # Connect to MongoDB
+        client = get_async_client()
+        db = client[MONGODB_DB_NAME]
+        
+        # Select collection based on guest_mode
+        collection_name = "Guest_Message_History" if guest_mode else "Message_History"
+        collection = db[collection_name]
+        
+        documents = collection.find(
+            {
+                "userId": {"$in": user_ids},
+                "$or": [
+                    {"businessContext": {"$exists": True}},
+                    {"messages.businessContext": {"$exists": True}}
+                ]
+            },
+            {"userId": 1, "businessContext": 1, "messages.businessContext": 1, "_id": 0}
+        )
+        
+        root_contexts = {}
+        message_contexts = {}
+        async for document in documents:
+            user_id = document.get("userId")
+            
+            if "businessContext" in document:
+                root_contexts.setdefault(user_id, document["businessContext"])
+            elif user_id not in message_contexts:
+                # Use the first message with business context
+                for message in document.get("messages", []):
+                    if "businessContext" in message:
+                        message_contexts[user_id] = message["businessContext"]
+                        break
+        
+        # Root-level business context takes precedence over message-level
+        message_contexts.update(root_contexts)
+        return message_contexts
+        
+    except Exception as e:
+        logger.error("Error retrieving business contexts from MongoDB: %s", e)
+        return None
+
+async def prefetch_business_contexts(user_ids: Iterable[str], guest_mode: bool = False) -> None:
+    """
+    Load the business contexts for many users into the lookup cache in one query.
+    
+    Subsequent get_cached_business_context calls for these users are served from
+    the cache, including users for which no business context exists. If the query
+    fails nothing is cached, so those calls fall back to per-user lookups.
+    
+    Args:
+        user_ids: The user IDs to prefetch business contexts for
+        guest_mode: Whether to use Guest_Message_History collection
+    """
+    user_ids = set(user_ids)
+    contexts = await get_business_contexts_bulk(user_ids, guest_mode)
+    if contexts is None:
+        return
+    
+    loop = asyncio.get_running_loop()
+    for user_id in user_ids:
+        future = loop.create_future()
+        future.set_result(contexts.get(user_id))
+        _business_context_cache[(user_id, guest_mode)] = future
+        _business_context_cache.move_to_end((user_id, guest_mode))
+        if len(_business_context_cache) > BUSINESS_CONTEXT_CACHE_SIZE:
+            _business_context_cache.popitem(last=False)
@@ -0,0 +1,146 @@
+"""
+Judge response cache for the RAG evaluation pipeline.
+
+Stores raw judge responses in a local SQLite database keyed by a SHA-256 hash of
+the request, so re-running an evaluation over the same data doesn't pay for the
+same GPT-4o calls again.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import hashlib
+import threading
+from functools import cache
+from typing import Any, Dict, List, Optional
+
+from ..config.settings import JUDGE_CACHE_MODE, JUDGE_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Supported cache modes:
+# - enabled: serve hits and store new responses
+# - read-only: serve hits but never store
+# - replay: serve hits and fail on misses, proving a run is fully reproducible
+# - disabled: always call the judge
+CACHE_MODES = ("enabled", "read-only", "replay", "disabled")
+
+class CacheMissError(KeyError):
+    """A judge request wasn't cached although the cache runs in replay mode."""
+
+def make_cache_key(messages: List[Dict], model: str, params: Dict[str, Any]) -> str:
+    """
+    Build the cache key for a judge request.
+    
+    Args:
+        messages: Chat messages sent to the judge
+        model: Judge model name
+        params: Completion parameters such as temperature and response_format
+    
+    Returns:
+        Hex SHA-256 digest identifying the request
+    """
+    payload = json.dumps([messages, model, params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ResponseCache:
+    """
+    SQLite-backed store of judge responses.
+    
+    The database runs in WAL mode so lookups don't block on concurrent writes,
+    and a lock serializes access from the event loop and worker threads.
+    """
+    
+    def __init__(self, path: str, mode: str = "enabled"):
+        """
+        Initialize the cache.
+        
+        Args:
+            path: Location of the SQLite database file
+            mode: One of CACHE_MODES
+        """
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown judge cache mode '{mode}', expected one of {CACHE_MODES}")
+        
+        self.mode = mode
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+    
+    @property
+    def active(self) -> bool:
+        """Whether lookups go through the cache at all."""
+        return self.mode != "disabled"
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use."""
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL)"
+            )
+            self._connection = connection
+        return self._connection
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached judge response.
+        
+        Args:
+            key: Cache key from make_cache_key
+        
+        Returns:
+            The cached response, or None on a miss or when the cache is disabled
+        
+        Raises:
+            CacheMissError: On a miss in replay mode
+        """
+        if not self.active:
+            return None
+        
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        
+        if row is None and self.mode == "replay":
+            raise CacheMissError(f"Judge response {key} is not cached (replay mode)")
+        return row[0] if row else None
+    
+    def put(self, key: str, response: str) -> None:
+        """
+        Store a judge response; only done in enabled mode.
+        
+        Args:
+            key: Cache key from make_cache_key
+            response: Raw judge response text
+        """
+        if self.mode != "enabled":
+            return
+        
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, response) VALUES (?, ?)", (key, response)
+                )
+                connection.commit()
+        except sqlite3.Error as e:
+            # A failed write only costs a future cache hit
+            logger.error("Error storing judge response in cache: %s", e)
+
+@cache
+def get_response_cache() -> ResponseCache:
+    """
+    Return the process-wide judge response cache.
+    
+    Returns:
+        Response cache configured from the settings
+    """
+    return ResponseCache(JUDGE_CACHE_PATH, JUDGE_CACHE_MODE)
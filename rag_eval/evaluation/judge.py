@@ -7,55 +7,332 @@ evaluation rubric implemented by a GPT-4o judge.
 
 import re
 import json
-from typing import Dict, List, Optional
+import asyncio
+import logging
+import importlib.util
+import operator
+import concurrent.futures
+from functools import cache, reduce
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 import openai
 from langfuse import Langfuse
+from tenacity import (
+    before_sleep_log,
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential_jitter
+)
 
-from ..config.prompts import EVAL_JUDGE_PROMPT
+try:
+    # orjson parses the judge's JSON responses several times faster than json
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
-def parse_evaluation_results(evaluation_text: str) -> Dict:
+from ..config.prompts import (
+    CompiledTemplate,
+    get_eval_judge_template,
+    get_eval_judge_sections,
+    get_eval_judge_batch_template
+)
+from ..config.settings import OPENAI_RPM, OPENAI_TPM
+from ..utils.clients import get_async_openai_client
+from ..utils.rate_limit import TokenBucket
+from .cache import CacheMissError, get_response_cache, make_cache_key
+
+# The optional msgspec package validates judge responses against their expected
+# structure while parsing them
+MSGSPEC_AVAILABLE = importlib.util.find_spec("msgspec") is not None
+if MSGSPEC_AVAILABLE:
+    import msgspec
+    from .schema import JUDGE_RESPONSE_DECODER, JudgeResponse
+    # Responses that aren't JSON at all, from either parser, go to the legacy-format parsing
+    JSON_DECODE_ERRORS = (json.JSONDecodeError, msgspec.DecodeError)
+else:
+    JSON_DECODE_ERRORS = (json.JSONDecodeError,)
+
+logger = logging.getLogger(__name__)
+
+# Judge model configuration
+JUDGE_MODEL = "gpt-4o"
+JUDGE_COMPLETION_PARAMS = {
+    "temperature": 0,  # Use deterministic output
+    "response_format": {"type": "json_object"}  # Ensure JSON response
+}
+
+# Template fields holding the reference chunks in the judge prompt
+JUDGE_CHUNK_FIELDS = tuple(f"chunk{i}" for i in range(1, 7))
+
+# Business context given to the judge; the same for every item, so it is baked
+# into the judge templates once
+JUDGE_BUSINESS_CONTEXT = """
+    Business Context:
+    - Role Or Background: Aspiring entrepreneur
+    - Annual Revenue: Pre-revenue
+    - Primary Business Goal: Launch New Product
+    - Business Stage: Ideation
+    - Target Market: B2B
+    - Primary Aspiration: Develop an innovative product/service
     """
-    Parse the evaluation results from the LLM judge's response.
+
+# Batching configuration for AsyncJudgeBatcher
+JUDGE_BATCH_SIZE = 8
+JUDGE_MAX_WAIT_MS = 75
+# Maximum number of judge calls AsyncJudgeBatcher runs at once
+JUDGE_MAX_IN_FLIGHT = 32
+
+# Retries of a judge call on transient OpenAI errors, with exponential backoff
+# and jitter between attempts (in seconds)
+JUDGE_RETRY_ATTEMPTS = 6
+JUDGE_RETRY_INITIAL_WAIT = 1
+JUDGE_RETRY_MAX_WAIT = 60
+JUDGE_RETRY_EXCEPTIONS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError
+)
+
+# Judgment, score and reasoning patterns per dimension for parsing old-format
+# (non-JSON) judge responses, compiled once at import
+FALLBACK_PATTERNS = {
+    'accuracy': (
+        re.compile(r'Accuracy Judgment:\s*(\w+)'),
+        re.compile(r'Accuracy Score \(0–10\):\s*(\d+)'),
+        re.compile(r'Accuracy Reasoning:\s*(.+?)(?=Relevance Judgment:|$)', re.DOTALL)
+    ),
+    'relevance': (
+        re.compile(r'Relevance Judgment:\s*(\w+)'),
+        re.compile(r'Relevance Score \(0–10\):\s*(\d+)'),
+        re.compile(r'Relevance Reasoning:\s*(.+?)(?=Coherence Judgment:|$)', re.DOTALL)
+    ),
+    'coherence': (
+        re.compile(r'Coherence Judgment:\s*(\w+)'),
+        re.compile(r'Coherence Score \(0–10\):\s*(\d+)'),
+        re.compile(r'Coherence Reasoning:\s*(.+?)(?=---|$)', re.DOTALL)
+    )
+}
+
+# The same fields as one pattern, so a complete old-format response is parsed in a
+# single scan; FALLBACK_PATTERNS is only used when some field is missing
+LEGACY_RESPONSE_RE = re.compile(
+    r'Accuracy Judgment:\s*(?P<accuracy_judgment>\w+).*?'
+    r'Accuracy Score \(0–10\):\s*(?P<accuracy_score>\d+).*?'
+    r'Accuracy Reasoning:\s*(?P<accuracy_reasoning>.+?)'
+    r'Relevance Judgment:\s*(?P<relevance_judgment>\w+).*?'
+    r'Relevance Score \(0–10\):\s*(?P<relevance_score>\d+).*?'
+    r'Relevance Reasoning:\s*(?P<relevance_reasoning>.+?)'
+    r'Coherence Judgment:\s*(?P<coherence_judgment>\w+).*?'
+    r'Coherence Score \(0–10\):\s*(?P<coherence_score>\d+).*?'
+    r'Coherence Reasoning:\s*(?P<coherence_reasoning>.+?)(?:---|$)',
+    re.DOTALL
+)
+
+# Default number of judge calls evaluate_batch keeps in flight
+JUDGE_MAX_CONCURRENT = 16
+
+# Default number of items graded together by evaluate_batch_in_one_call
+JUDGE_ITEMS_PER_CALL = 5
+
+# Prompt budget for a multi-item judge call, well below the 128k context of the
+# judge model so the completion for every item still fits
+JUDGE_MAX_PROMPT_TOKENS = 96000
+# Allowance for the "### Item n" heading and separator around each item's materials
+JUDGE_ITEM_HEADER_TOKENS = 16
+
+# Completion tokens reserved per judge call when charging the rate limiter
+JUDGE_COMPLETION_TOKEN_ESTIMATE = 2048
+
+# Exact prompt token counts need the optional tiktoken package
+TIKTOKEN_AVAILABLE = importlib.util.find_spec("tiktoken") is not None
+
+# Langfuse score name and the path to its node in the parsed judge results
+SCORE_SPEC = (
+    # Core evaluation dimensions
+    ("accuracy", ("accuracy",)),
+    ("relevance", ("relevance",)),
+    ("coherence", ("coherence",)),
+    # Safety evaluation dimensions
+    ("safety-user-jailbreak", ("safety", "user_query", "jailbreak_attempt")),
+    ("safety-user-toxicity", ("safety", "user_query", "toxicity")),
+    ("safety-ai-jailbreak", ("safety", "ai_response", "jailbreak_success")),
+    ("safety-ai-toxicity", ("safety", "ai_response", "toxicity")),
+    # Additional evaluation dimensions
+    ("business-context", ("business_context",)),
+    ("factual-accuracy", ("factual_accuracy",))
+)
+
+# Background workers sending judge scores to Langfuse, so score() calls don't
+# delay returning the evaluation results
+_SCORE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="langfuse-scores")
+_pending_score_futures = set()
+
+@cache
+def get_judge_rate_limiter() -> TokenBucket:
+    """
+    Return the process-wide rate limiter shared by all judge calls.
     
-    Handles both JSON format (preferred) and falls back to regex parsing for older format.
+    Returns:
+        Token bucket configured with the OpenAI RPM/TPM settings
+    """
+    return TokenBucket(OPENAI_RPM, OPENAI_TPM)
+
+@cache
+def _judge_encoding():
+    """Return the tiktoken encoding of the judge model."""
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model(JUDGE_MODEL)
+    except KeyError:
+        # Older tiktoken releases don't know the model yet
+        return tiktoken.get_encoding("cl100k_base")
+
+def estimate_judge_tokens(messages: List[Dict]) -> int:
+    """
+    Estimate the tokens a judge call consumes, including the reserved completion.
+    
+    Args:
+        messages: Chat messages sent to the judge model
+        
+    Returns:
+        Estimated prompt plus completion tokens
+    """
+    prompt_tokens = sum(_estimate_text_tokens(message["content"]) for message in messages)
+    return prompt_tokens + JUDGE_COMPLETION_TOKEN_ESTIMATE
+
+def _estimate_text_tokens(text: str) -> int:
+    """Estimate the number of judge model tokens in a piece of prompt text."""
+    if TIKTOKEN_AVAILABLE:
+        return len(_judge_encoding().encode(text))
+    # Roughly four characters per token for English text
+    return len(text) // 4
+
+def _core_dimension(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the judgment, score and reasoning of a core dimension from its judge JSON node."""
+    return {'judgment': node['judgment'], 'score': node['score'], 'reasoning': node['explanation']}
+
+def _score_fields(score, explanation_key: str = 'explanation') -> Dict[str, Any]:
+    """Convert a validated JudgeScore into the results dictionary for its dimension."""
+    return {'judgment': score.judgment, 'score': score.score, explanation_key: score.explanation}
+
+def _parse_validated_response(evaluation_text: str, keep_full: bool) -> Dict:
+    """
+    Parse and validate a JSON judge response with msgspec.
     
     Args:
         evaluation_text: The raw text response from the evaluation judge
+        keep_full: Also return the complete parsed JSON response under 'full_response'
         
     Returns:
         Structured dictionary with evaluation metrics and explanations
+        
+    Raises:
+        msgspec.DecodeError: If the response is not JSON
+        ValueError: If the response is JSON but misses fields or has the wrong types
     """
     try:
-        # Try to parse as JSON first
-        results = json.loads(evaluation_text)
-        
-        # Extract the relevant information from the JSON structure
-        return {
-            'accuracy': {
-                'judgment': results['accuracy_and_faithfulness_evaluation']['holistic_contextual_accuracy_and_faithfulness']['judgment'],
-                'score': results['accuracy_and_faithfulness_evaluation']['holistic_contextual_accuracy_and_faithfulness']['score'],
-                'reasoning': results['accuracy_and_faithfulness_evaluation']['holistic_contextual_accuracy_and_faithfulness']['explanation']
-            },
-            'relevance': {
-                'judgment': results['relevance_evaluation']['answer_chunk_relevance']['judgment'],
-                'score': results['relevance_evaluation']['answer_chunk_relevance']['score'],
-                'reasoning': results['relevance_evaluation']['answer_chunk_relevance']['explanation']
-            },
-            'coherence': {
-                'judgment': results['coherence_and_clarity_evaluation']['coherence_and_clarity']['judgment'],
-                'score': results['coherence_and_clarity_evaluation']['coherence_and_clarity']['score'],
-                'reasoning': results['coherence_and_clarity_evaluation']['coherence_and_clarity']['explanation']
+        response = JUDGE_RESPONSE_DECODER.decode(evaluation_text)
+    except msgspec.ValidationError as e:
+        # e.g. "Object missing required field `score` - at `$.relevance_evaluation.answer_chunk_relevance`"
+        raise ValueError(f"Judge response does not match the expected structure: {e}") from e
+    
+    parsed = _validated_fields(response)
+    if keep_full:
+        parsed['full_response'] = json_loads(evaluation_text)
+    return parsed
+
+def _validated_fields(response: "JudgeResponse") -> Dict:
+    """Build the structured results from a validated judge response."""
+    accuracy_eval = response.accuracy_and_faithfulness_evaluation
+    user_query = response.safety_evaluation.user_query
+    ai_response = response.safety_evaluation.ai_response
+    parsed = {
+        'accuracy': _score_fields(accuracy_eval.holistic_contextual_accuracy_and_faithfulness, 'reasoning'),
+        'relevance': _score_fields(response.relevance_evaluation.answer_chunk_relevance, 'reasoning'),
+        'coherence': _score_fields(response.coherence_and_clarity_evaluation.coherence_and_clarity, 'reasoning'),
+        'safety': {
+            'user_query': {
+                'jailbreak_attempt': _score_fields(user_query.jailbreak_attempt),
+                'toxicity': _score_fields(user_query.toxicity)
             },
+            'ai_response': {
+                'jailbreak_success': _score_fields(ai_response.jailbreak_success),
+                'toxicity': _score_fields(ai_response.toxicity)
+            }
+        },
+        'business_context': _score_fields(accuracy_eval.business_context_adherence),
+        'factual_accuracy': _score_fields(accuracy_eval.factual_accuracy_world_knowledge)
+    }
+    return parsed
+
+def parse_evaluation_object(results: Dict, keep_full: bool = False) -> Dict:
+    """
+    Extract the structured results from an already decoded JSON judge response.
+    
+    Used for the per-item evaluations of a multi-item judge response, which are
+    decoded together, so they don't have to be serialized and parsed again.
+    
+    Args:
+        results: Decoded judge response for a single item
+        keep_full: Also return the complete response under 'full_response'
+        
+    Returns:
+        Structured dictionary with evaluation metrics and explanations
+        
+    Raises:
+        ValueError: If msgspec is installed and the response misses fields or has the wrong types
+        KeyError: If msgspec isn't installed and the response misses fields
+    """
+    if MSGSPEC_AVAILABLE:
+        try:
+            parsed = _validated_fields(msgspec.convert(results, JudgeResponse))
+        except msgspec.ValidationError as e:
+            raise ValueError(f"Judge response does not match the expected structure: {e}") from e
+    else:
+        # Look up each section once instead of walking the full path for every field
+        accuracy_eval = results['accuracy_and_faithfulness_evaluation']
+        safety_eval = results['safety_evaluation']
+        parsed = {
+            'accuracy': _core_dimension(accuracy_eval['holistic_contextual_accuracy_and_faithfulness']),
+            'relevance': _core_dimension(results['relevance_evaluation']['answer_chunk_relevance']),
+            'coherence': _core_dimension(results['coherence_and_clarity_evaluation']['coherence_and_clarity']),
             'safety': {
-                'user_query': results['safety_evaluation']['user_query'],
-                'ai_response': results['safety_evaluation']['ai_response']
+                'user_query': safety_eval['user_query'],
+                'ai_response': safety_eval['ai_response']
             },
-            'business_context': results['accuracy_and_faithfulness_evaluation']['business_context_adherence'],
-            'factual_accuracy': results['accuracy_and_faithfulness_evaluation']['factual_accuracy_world_knowledge'],
-            'full_response': results
+            'business_context': accuracy_eval['business_context_adherence'],
+            'factual_accuracy': accuracy_eval['factual_accuracy_world_knowledge']
         }
-    except json.JSONDecodeError:
+    if keep_full:
+        parsed['full_response'] = results
+    return parsed
+
+def parse_evaluation_results(evaluation_text: str, keep_full: bool = False) -> Dict:
+    """
+    Parse the evaluation results from the LLM judge's response.
+    
+    Handles both JSON format (preferred) and falls back to regex parsing for older format.
+    With msgspec installed, JSON responses are also validated against the expected
+    structure, so a missing or mistyped field is reported with its path.
+    
+    Args:
+        evaluation_text: The raw text response from the evaluation judge
+        keep_full: Also return the complete parsed JSON response under 'full_response'.
+            Off by default, since the results are logged to Langfuse and saved per
+            evaluation and nothing downstream reads the raw response
+        
+    Returns:
+        Structured dictionary with evaluation metrics and explanations
+    """
+    try:
+        if MSGSPEC_AVAILABLE:
+            return _parse_validated_response(evaluation_text, keep_full)
+        
+        # Try to parse as JSON first (orjson's decode error subclasses json.JSONDecodeError)
+        return parse_evaluation_object(json_loads(evaluation_text), keep_full)
+    except JSON_DECODE_ERRORS:
         # Fall back to regex parsing for old format responses
         # Create empty results structure for the older format
         results = {
@@ -64,44 +341,511 @@ def parse_evaluation_results(evaluation_text: str) -> Dict:
             'coherence': {'judgment': None, 'score': None, 'reasoning': None}
         }
         
-        # Extract accuracy information using regex patterns
-        accuracy_judgment_match = re.search(r'Accuracy Judgment:\s*(\w+)', evaluation_text)
-        accuracy_score_match = re.search(r'Accuracy Score \(0–10\):\s*(\d+)', evaluation_text)
-        accuracy_reasoning_match = re.search(r'Accuracy Reasoning:\s*(.+?)(?=Relevance Judgment:|$)', evaluation_text, re.DOTALL)
-        
-        if accuracy_judgment_match:
-            results['accuracy']['judgment'] = accuracy_judgment_match.group(1).strip()
-        if accuracy_score_match:
-            results['accuracy']['score'] = int(accuracy_score_match.group(1))
-        if accuracy_reasoning_match:
-            results['accuracy']['reasoning'] = accuracy_reasoning_match.group(1).strip()
-        
-        # Extract relevance information
-        relevance_judgment_match = re.search(r'Relevance Judgment:\s*(\w+)', evaluation_text)
-        relevance_score_match = re.search(r'Relevance Score \(0–10\):\s*(\d+)', evaluation_text)
-        relevance_reasoning_match = re.search(r'Relevance Reasoning:\s*(.+?)(?=Coherence Judgment:|$)', evaluation_text, re.DOTALL)
-        
-        if relevance_judgment_match:
-            results['relevance']['judgment'] = relevance_judgment_match.group(1).strip()
-        if relevance_score_match:
-            results['relevance']['score'] = int(relevance_score_match.group(1))
-        if relevance_reasoning_match:
-            results['relevance']['reasoning'] = relevance_reasoning_match.group(1).strip()
-        
-        # Extract coherence information
-        coherence_judgment_match = re.search(r'Coherence Judgment:\s*(\w+)', evaluation_text)
-        coherence_score_match = re.search(r'Coherence Score \(0–10\):\s*(\d+)', evaluation_text)
-        coherence_reasoning_match = re.search(r'Coherence Reasoning:\s*(.+?)(?=---|$)', evaluation_text, re.DOTALL)
-        
-        if coherence_judgment_match:
-            results['coherence']['judgment'] = coherence_judgment_match.group(1).strip()
-        if coherence_score_match:
-            results['coherence']['score'] = int(coherence_score_match.group(1))
-        if coherence_reasoning_match:
-            results['coherence']['reasoning'] = coherence_reasoning_match.group(1).strip()
+        # Complete responses are parsed in one pass
+        legacy_match = LEGACY_RESPONSE_RE.search(evaluation_text)
+        if legacy_match:
+            fields = legacy_match.groupdict()
+            for dimension in results:
+                results[dimension] = {
+                    'judgment': fields[f'{dimension}_judgment'].strip(),
+                    'score': int(fields[f'{dimension}_score']),
+                    'reasoning': fields[f'{dimension}_reasoning'].strip()
+                }
+            return results
+        
+        # Otherwise extract each dimension's judgment, score and reasoning separately
+        for dimension, (judgment_re, score_re, reasoning_re) in FALLBACK_PATTERNS.items():
+            judgment_match = judgment_re.search(evaluation_text)
+            score_match = score_re.search(evaluation_text)
+            reasoning_match = reasoning_re.search(evaluation_text)
+            
+            if judgment_match:
+                results[dimension]['judgment'] = judgment_match.group(1).strip()
+            if score_match:
+                results[dimension]['score'] = int(score_match.group(1))
+            if reasoning_match:
+                results[dimension]['reasoning'] = reasoning_match.group(1).strip()
         
         return results
 
+class AsyncJudgeBatcher:
+    """
+    Collects judge requests and dispatches them to OpenAI in concurrent batches.
+    
+    Requests submitted via submit() are queued and a background worker drains up
+    to batch_size of them (or whatever arrived within max_wait_ms) and starts them
+    together, amortizing the per-request overhead. The worker doesn't wait for a
+    batch to finish before starting the next one, so a slow or retrying call only
+    holds up its own caller; at most max_in_flight calls run at once.
+    """
+    
+    def __init__(self, openai_client: Optional[openai.AsyncOpenAI] = None, batch_size: int = JUDGE_BATCH_SIZE,
+                 max_wait_ms: float = JUDGE_MAX_WAIT_MS, max_in_flight: int = JUDGE_MAX_IN_FLIGHT):
+        """
+        Initialize the batcher.
+        
+        Args:
+            openai_client: Async OpenAI client used for the judge calls; defaults to
+                the shared pooled client
+            batch_size: Maximum number of requests dispatched together
+            max_wait_ms: Maximum time to wait for a batch to fill up
+            max_in_flight: Maximum number of judge calls running at once
+        """
+        self.openai_client = openai_client or get_async_openai_client()
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_in_flight = max_in_flight
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._futures: Set[asyncio.Future] = set()
+    
+    async def submit(self, messages: List[Dict]) -> str:
+        """
+        Queue a judge request and wait for its result.
+        
+        Args:
+            messages: Chat messages to send to the judge model
+            
+        Returns:
+            The raw evaluation text returned by the judge
+        
+        Raises:
+            RuntimeError: If the batcher is closed before the request completes
+        """
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._worker = asyncio.create_task(self._run())
+        
+        future = asyncio.get_running_loop().create_future()
+        self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+        await self._queue.put((messages, future))
+        return await future
+    
+    async def close(self) -> None:
+        """
+        Stop the background worker and the judge calls still running.
+        
+        Requests that haven't completed yet, queued or in flight, fail with a
+        RuntimeError so their callers don't wait forever.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        for future in list(self._futures):
+            if not future.done():
+                future.set_exception(RuntimeError("Judge batcher closed before the request completed"))
+    
+    async def _run(self) -> None:
+        """Drain the queue in batches and start each request of a batch as its own task."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            
+            # Keep collecting requests until the batch is full or the wait expires
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            for messages, future in batch:
+                task = asyncio.create_task(self._dispatch(messages, future))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+    
+    async def _dispatch(self, messages: List[Dict], future: asyncio.Future) -> None:
+        """Send a single judge request and resolve its future."""
+        try:
+            async with self._semaphore:
+                await get_judge_rate_limiter().acquire(estimate_judge_tokens(messages))
+                evaluation_text = await _complete_judge_async(self.openai_client, messages)
+            if not future.done():
+                future.set_result(evaluation_text)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+
+# Backoff between judge retries when the server doesn't say how long to wait
+_judge_backoff = wait_exponential_jitter(initial=JUDGE_RETRY_INITIAL_WAIT, max=JUDGE_RETRY_MAX_WAIT)
+
+def _judge_retry_wait(retry_state) -> float:
+    """Wait as long as the server's Retry-After header asks, or back off exponentially."""
+    response = getattr(retry_state.outcome.exception(), "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), JUDGE_RETRY_MAX_WAIT)
+        except ValueError:
+            pass  # An HTTP date rather than seconds
+    return _judge_backoff(retry_state)
+
+# Retry policy for judge calls; works on both the sync and async helpers below
+_judge_retry = retry(
+    stop=stop_after_attempt(JUDGE_RETRY_ATTEMPTS),
+    wait=_judge_retry_wait,
+    retry=retry_if_exception_type(JUDGE_RETRY_EXCEPTIONS),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True
+)
+
+@_judge_retry
+def _complete_judge(openai_client: openai.OpenAI, messages: List[Dict]) -> str:
+    """
+    Call the judge model and return its response text.
+    
+    The response is streamed and assembled from its deltas, so receiving it
+    overlaps with generation instead of waiting for the full response object.
+    Transient errors are retried by _judge_retry instead of the SDK's own
+    retries, so the two don't multiply.
+    
+    Args:
+        openai_client: Synchronous OpenAI client
+        messages: Chat messages for the judge model
+        
+    Returns:
+        The judge response text
+    """
+    stream = openai_client.with_options(max_retries=0).chat.completions.create(
+        model=JUDGE_MODEL,
+        messages=messages,
+        stream=True,
+        **JUDGE_COMPLETION_PARAMS
+    )
+    return "".join(chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices)
+
+@_judge_retry
+async def _complete_judge_async(openai_client: openai.AsyncOpenAI, messages: List[Dict]) -> str:
+    """
+    Call the judge model and return its response text, streaming it.
+    
+    While the deltas arrive the event loop is free to run other evaluations.
+    
+    Args:
+        openai_client: Asynchronous OpenAI client
+        messages: Chat messages for the judge model
+        
+    Returns:
+        The judge response text
+    """
+    stream = await openai_client.with_options(max_retries=0).chat.completions.create(
+        model=JUDGE_MODEL,
+        messages=messages,
+        stream=True,
+        **JUDGE_COMPLETION_PARAMS
+    )
+    parts = []
+    async for chunk in stream:
+        if chunk.choices:
+            parts.append(chunk.choices[0].delta.content or "")
+    return "".join(parts)
+
+def _lookup_cached_response(messages: List[Dict]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Look up a judge request in the response cache.
+    
+    Args:
+        messages: Chat messages to send to the judge model
+        
+    Returns:
+        Tuple of the cache key (None when caching is disabled) and the cached response, if any
+    
+    Raises:
+        CacheMissError: If the request isn't cached and the cache runs in replay mode
+    """
+    response_cache = get_response_cache()
+    if not response_cache.active:
+        return None, None
+    key = make_cache_key(messages, JUDGE_MODEL, JUDGE_COMPLETION_PARAMS)
+    return key, response_cache.get(key)
+
+def _store_cached_response(key: Optional[str], evaluation_text: str) -> None:
+    """Store a fresh judge response under the key from _lookup_cached_response."""
+    if key is not None:
+        get_response_cache().put(key, evaluation_text)
+
+async def _lookup_cached_response_async(messages: List[Dict]) -> Tuple[Optional[str], Optional[str]]:
+    """Like _lookup_cached_response, but queries SQLite on a worker thread instead of the event loop."""
+    if not get_response_cache().active:
+        return None, None
+    return await asyncio.to_thread(_lookup_cached_response, messages)
+
+async def _store_cached_response_async(key: Optional[str], evaluation_text: str) -> None:
+    """Like _store_cached_response, but writes to SQLite on a worker thread instead of the event loop."""
+    if key is not None:
+        await asyncio.to_thread(_store_cached_response, key, evaluation_text)
+
+@cache
+def _judge_template(chunk_count: int) -> CompiledTemplate:
+    """Return the single-item judge prompt for chunk_count chunks with the business context filled in."""
+    return get_eval_judge_template(chunk_count).bind(business_context=JUDGE_BUSINESS_CONTEXT)
+
+@cache
+def _judge_materials_template(chunk_count: int) -> CompiledTemplate:
+    """Return the per-item judge materials for chunk_count chunks with the business context filled in."""
+    return get_eval_judge_sections(chunk_count)[1].bind(business_context=JUDGE_BUSINESS_CONTEXT)
+
+def _judge_chunk_count(chunks: List[str]) -> int:
+    """Return the number of chunk slots the judge prompt needs for these chunks."""
+    return min(len(chunks), len(JUDGE_CHUNK_FIELDS))
+
+def _judge_values(question: str, chunks: List[str], answer: str) -> Dict[str, Any]:
+    """
+    Build the per-item judge prompt fields for a question, its chunks, and the answer.
+    
+    Args:
+        question: The original question
+        chunks: The retrieved chunks used for the answer
+        answer: The generated answer to evaluate
+        
+    Returns:
+        Mapping of judge template field names to values
+    """
+    # Map the first 6 chunks onto the chunk1..chunk6 fields; templates from
+    # _judge_template only have slots for the chunks that exist
+    values = dict(zip(JUDGE_CHUNK_FIELDS, chunks))
+    values['question'] = question
+    values['answer'] = answer
+    return values
+
+def _build_judge_messages(question: str, chunks: List[str], answer: str) -> List[Dict]:
+    """
+    Build the chat messages for the judge from the question, chunks, and answer.
+    
+    Args:
+        question: The original question
+        chunks: The retrieved chunks used for the answer
+        answer: The generated answer to evaluate
+        
+    Returns:
+        List of chat messages for the judge model
+    """
+    # Prepare the prompt by formatting it with the question, chunks, and answer
+    prompt = _judge_template(_judge_chunk_count(chunks)).render_map(_judge_values(question, chunks, answer))
+    
+    return [
+        {"role": "system", "content": "You are an evaluation judge."},
+        {"role": "user", "content": prompt}
+    ]
+
+def _judge_item_materials(item: Dict[str, Any]) -> str:
+    """Render the materials section (question, chunks and answer) of one item of a multi-item judge call."""
+    return _judge_materials_template(_judge_chunk_count(item['chunks'])).render_map(
+        _judge_values(item['question'], item['chunks'], item['answer'])
+    )
+
+def _build_batch_judge_messages(items: List[Dict[str, Any]]) -> List[Dict]:
+    """
+    Build the chat messages for grading several items in a single judge call.
+    
+    The instructions and rubric of the judge prompt are sent once, with the
+    materials of every item in numbered sections between them.
+    
+    Args:
+        items: Dictionaries with 'question', 'chunks' and 'answer'
+        
+    Returns:
+        List of chat messages for the judge model
+    """
+    header, _, rubric = get_eval_judge_sections()
+    sections = [header, get_eval_judge_batch_template().render(count=len(items))]
+    sections.extend(
+        f"\n### Item {number}\n" + _judge_item_materials(item)
+        for number, item in enumerate(items, 1)
+    )
+    sections.append(rubric)
+    
+    return [
+        {"role": "system", "content": "You are an evaluation judge."},
+        {"role": "user", "content": "\n---\n".join(sections)}
+    ]
+
+@cache
+def _batch_judge_shared_tokens(k: int) -> int:
+    """Estimate the prompt tokens of a multi-item judge call that don't depend on its items."""
+    header, _, rubric = get_eval_judge_sections()
+    return sum(
+        _estimate_text_tokens(text)
+        for text in ("You are an evaluation judge.", header, get_eval_judge_batch_template().render(count=k), rubric)
+    )
+
+def _group_items_for_one_call(items: List[Dict[str, Any]], k: int) -> List[List[Dict[str, Any]]]:
+    """
+    Split items into groups of at most k that fit into a single judge prompt.
+    
+    Args:
+        items: Dictionaries with 'question', 'chunks' and 'answer'
+        k: Maximum number of items per group
+        
+    Returns:
+        Groups of consecutive items
+    """
+    # The instructions and rubric are sent once per group, the materials once per item
+    shared_tokens = _batch_judge_shared_tokens(k)
+    groups = []
+    group = []
+    group_tokens = shared_tokens
+    for item in items:
+        item_tokens = _estimate_text_tokens(_judge_item_materials(item)) + JUDGE_ITEM_HEADER_TOKENS
+        if group and (len(group) >= k or group_tokens + item_tokens > JUDGE_MAX_PROMPT_TOKENS):
+            groups.append(group)
+            group = []
+            group_tokens = shared_tokens
+        group.append(item)
+        group_tokens += item_tokens
+    if group:
+        groups.append(group)
+    return groups
+
+def _score_payload(name: str, node: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the Langfuse score arguments for one evaluation dimension.
+    
+    Args:
+        name: Langfuse score name
+        node: Parsed results for the dimension
+        
+    Returns:
+        Keyword arguments for langfuse.score(), without the trace ID
+    """
+    judgment = node.get('judgment')
+    # Core dimensions carry 'reasoning', the others 'explanation'
+    explanation = node['explanation'] if 'explanation' in node else node.get('reasoning')
+    return dict(
+        name=name,
+        value=node['score'],
+        comment=f"Judgment: {judgment}\nExplanation: {explanation}",
+        properties={"judgment": judgment},
+        expose_props=["judgment"]
+    )
+
+def _send_scores(langfuse: Langfuse, trace_id: str, scores: List[Dict[str, Any]]) -> None:
+    """Send judge scores to Langfuse; runs on the score executor."""
+    for score in scores:
+        try:
+            langfuse.score(trace_id=trace_id, **score)
+        except Exception as e:
+            logger.error("Error logging score '%s' to Langfuse: %s", score.get('name'), e)
+
+def _submit_scores(langfuse: Langfuse, trace_id: str, scores: List[Dict[str, Any]]) -> None:
+    """Queue judge scores for sending in the background."""
+    future = _SCORE_EXECUTOR.submit(_send_scores, langfuse, trace_id, scores)
+    _pending_score_futures.add(future)
+    future.add_done_callback(_pending_score_futures.discard)
+
+def wait_for_scores(timeout: Optional[float] = None) -> None:
+    """
+    Wait for queued Langfuse scores to be handed to the SDK.
+    
+    Call this before langfuse.flush() so the flush includes every score.
+    
+    Args:
+        timeout: Maximum number of seconds to wait, or None to wait indefinitely
+    """
+    if _pending_score_futures:
+        concurrent.futures.wait(list(_pending_score_futures), timeout=timeout)
+
+def _start_eval_span(messages: List[Dict], langfuse: Optional[Langfuse], trace_id: Optional[str]):
+    """Create the Langfuse span for the judge call if tracing is enabled."""
+    if langfuse and trace_id:
+        return langfuse.span(
+            name="evaluation-generation",
+            trace_id=trace_id,
+            input={
+                "prompt": messages[-1]["content"],
+                "model": JUDGE_MODEL
+            }
+        )
+    return None
+
+def _process_evaluation_text(evaluation_text: str, messages: List[Dict], eval_span,
+                             langfuse: Optional[Langfuse], trace_id: Optional[str]) -> Dict:
+    """
+    Log the judge output to Langfuse and parse it into structured results.
+    
+    Args:
+        evaluation_text: The raw text response from the evaluation judge
+        messages: The chat messages sent to the judge
+        eval_span: Langfuse span for the judge call, if any
+        langfuse: Langfuse instance for logging
+        trace_id: Langfuse trace ID for linking spans
+        
+    Returns:
+        Dictionary with detailed evaluation results across all dimensions
+    """
+    _log_evaluation(messages, evaluation_text, eval_span, langfuse, trace_id)
+    
+    # Parse the evaluation results into a structured format
+    results = parse_evaluation_results(evaluation_text)
+    
+    _log_dimension_scores(results, langfuse, trace_id)
+    return results
+
+def _log_evaluation(messages: List[Dict], output: Any, eval_span,
+                    langfuse: Optional[Langfuse], trace_id: Optional[str]) -> None:
+    """Log the judge generation to Langfuse and end its span, if tracing is enabled."""
+    if langfuse and trace_id:
+        langfuse.generation(
+            name="evaluation-generation",
+            trace_id=trace_id,
+            model=JUDGE_MODEL,
+            model_parameters={"temperature": 0},
+            input=messages,
+            output=output
+        )
+        
+        # Update the evaluation span with the output
+        if eval_span:
+            eval_span.update(output={"evaluation_text": output})
+            eval_span.end()  # Explicitly end the span
+
+def _log_dimension_scores(results: Dict, langfuse: Optional[Langfuse], trace_id: Optional[str]) -> None:
+    """
+    Log individual dimension scores to Langfuse as observations if available.
+    
+    The payloads are built here, but sent from a background thread so the caller
+    doesn't wait on the SDK.
+    """
+    if langfuse and trace_id:
+        scores = [
+            _score_payload(name, reduce(operator.getitem, path, results))
+            for name, path in SCORE_SPEC
+        ]
+        _submit_scores(langfuse, trace_id, scores)
+
+def _evaluation_error_results(e: Exception) -> Dict:
+    """Return an empty results structure describing an evaluation failure."""
+    return {
+        'accuracy': {'judgment': None, 'score': 0, 'reasoning': f"Error: {str(e)}"},
+        'relevance': {'judgment': None, 'score': 0, 'reasoning': f"Error: {str(e)}"},
+        'coherence': {'judgment': None, 'score': 0, 'reasoning': f"Error: {str(e)}"},
+        'safety': {
+            'user_query': {'jailbreak_attempt': {'judgment': None, 'score': 0, 'explanation': f"Error: {str(e)}"},
+                           'toxicity': {'judgment': None, 'score': 0, 'explanation': f"Error: {str(e)}"}},
+            'ai_response': {'jailbreak_success': {'judgment': None, 'score': 0, 'explanation': f"Error: {str(e)}"},
+                            'toxicity': {'judgment': None, 'score': 0, 'explanation': f"Error: {str(e)}"}}
+        },
+        'business_context': {'judgment': None, 'score': 0, 'explanation': f"Error: {str(e)}"},
+        'factual_accuracy': {'judgment': None, 'score': 0, 'explanation': f"Error: {str(e)}"}
+    }
+
 def evaluate_using_rag_prompt(question: str, chunks: List[str], answer: str, 
                             openai_client: openai.OpenAI, langfuse: Optional[Langfuse] = None, 
                             trace_id: Optional[str] = None) -> Dict:
@@ -123,183 +867,179 @@ def evaluate_using_rag_prompt(question: str, chunks: List[str], answer: str,
         Dictionary with detailed evaluation results across all dimensions
     """
     try:
-        # Ensure we have exactly 6 chunks by padding with empty strings if necessary
-        chunks = (chunks + [''] * 6)[:6]
-        
-        # Format the business context
-        business_context = """
-        Business Context:
-        - Role Or Background: Aspiring entrepreneur
-        - Annual Revenue: Pre-revenue
-        - Primary Business Goal: Launch New Product
-        - Business Stage: Ideation
-        - Target Market: B2B
-        - Primary Aspiration: Develop an innovative product/service
-        """
+        messages = _build_judge_messages(question, chunks, answer)
+        eval_span = _start_eval_span(messages, langfuse, trace_id)
         
-        # Prepare the prompt by formatting it with the question, chunks, and answer
-        prompt = EVAL_JUDGE_PROMPT.format(
-            question=question,
-            business_context=business_context,
-            chunk1=chunks[0],
-            chunk2=chunks[1],
-            chunk3=chunks[2],
-            chunk4=chunks[3],
-            chunk5=chunks[4],
-            chunk6=chunks[5],
-            answer=answer
-        )
+        cache_key, evaluation_text = _lookup_cached_response(messages)
+        if evaluation_text is None:
+            # Call OpenAI API with JSON output format
+            evaluation_text = _complete_judge(openai_client, messages)
+            _store_cached_response(cache_key, evaluation_text)
         
-        # Create a span for evaluation if using Langfuse
-        eval_span = None
-        if langfuse and trace_id:
-            eval_span = langfuse.span(
-                name="evaluation-generation",
-                trace_id=trace_id,
-                input={
-                    "prompt": prompt,
-                    "model": "gpt-4o"
-                }
-            )
+        return _process_evaluation_text(evaluation_text, messages, eval_span, langfuse, trace_id)
         
-        # Run evaluation using OpenAI client
-        messages = [
-            {"role": "system", "content": "You are an evaluation judge."},
-            {"role": "user", "content": prompt}
-        ]
+    except CacheMissError:
+        # A replay run must fail loudly instead of reporting error rows
+        raise
+    except Exception as e:
+        logger.error("Error in evaluation: %s", e)
+        return _evaluation_error_results(e)
+
+async def evaluate_using_rag_prompt_async(question: str, chunks: List[str], answer: str,
+                                          batcher: AsyncJudgeBatcher, langfuse: Optional[Langfuse] = None,
+                                          trace_id: Optional[str] = None) -> Dict:
+    """
+    Evaluate the generated answer through a shared AsyncJudgeBatcher.
+    
+    Behaves like evaluate_using_rag_prompt, but the judge call is queued on the
+    batcher so that concurrent evaluations are dispatched together.
+    
+    Args:
+        question: The original question
+        chunks: The retrieved chunks used for the answer
+        answer: The generated answer to evaluate
+        batcher: Batcher used to dispatch the judge call
+        langfuse: Langfuse instance for logging
+        trace_id: Langfuse trace ID for linking spans
         
-        # Call OpenAI API with JSON output format
-        response = openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            temperature=0,  # Use deterministic output
-            response_format={"type": "json_object"}  # Ensure JSON response
-        )
+    Returns:
+        Dictionary with detailed evaluation results across all dimensions
+    """
+    try:
+        messages = _build_judge_messages(question, chunks, answer)
+        eval_span = _start_eval_span(messages, langfuse, trace_id)
         
-        # Extract the evaluation text from the response
-        evaluation_text = response.choices[0].message.content
-        
-        # Log the generation to Langfuse if available
-        if langfuse and trace_id:
-            generation = langfuse.generation(
-                name="evaluation-generation",
-                trace_id=trace_id,
-                model="gpt-4o",
-                model_parameters={"temperature": 0},
-                input=messages,
-                output=evaluation_text
-            )
-            
-            # Update the evaluation span with the output
-            if eval_span:
-                eval_span.update(output={"evaluation_text": evaluation_text})
-                eval_span.end()  # Explicitly end the span
-        
-        # Parse the evaluation results into a structured format
-        results = parse_evaluation_results(evaluation_text)
-        
-        # Log individual dimension scores to Langfuse as observations if available
-        if langfuse and trace_id:
-            # Core evaluation dimensions
-            langfuse.score(
-                name="accuracy",
-                trace_id=trace_id,
-                value=results['accuracy']['score'],
-                comment=f"Judgment: {results['accuracy']['judgment']}\nExplanation: {results['accuracy']['reasoning']}",
-                properties={"judgment": results['accuracy']['judgment']},
-                expose_props=["judgment"]
-            )
-            
-            langfuse.score(
-                name="relevance",
-                trace_id=trace_id,
-                value=results['relevance']['score'],
-                comment=f"Judgment: {results['relevance']['judgment']}\nExplanation: {results['relevance']['reasoning']}",
-                properties={"judgment": results['relevance']['judgment']},
-                expose_props=["judgment"]
-            )
-            
-            langfuse.score(
-                name="coherence",
-                trace_id=trace_id,
-                value=results['coherence']['score'],
-                comment=f"Judgment: {results['coherence']['judgment']}\nExplanation: {results['coherence']['reasoning']}",
-                properties={"judgment": results['coherence']['judgment']},
-                expose_props=["judgment"]
-            )
-            
-            # Safety evaluation dimensions
-            langfuse.score(
-                name="safety-user-jailbreak",
-                trace_id=trace_id,
-                value=results['safety']['user_query']['jailbreak_attempt']['score'],
-                comment=f"Judgment: {results['safety']['user_query']['jailbreak_attempt']['judgment']}\nExplanation: {results['safety']['user_query']['jailbreak_attempt']['explanation']}",
-                properties={"judgment": results['safety']['user_query']['jailbreak_attempt']['judgment']},
-                expose_props=["judgment"]
-            )
-            
-            langfuse.score(
-                name="safety-user-toxicity",
-                trace_id=trace_id,
-                value=results['safety']['user_query']['toxicity']['score'],
-                comment=f"Judgment: {results['safety']['user_query']['toxicity']['judgment']}\nExplanation: {results['safety']['user_query']['toxicity']['explanation']}",
-                properties={"judgment": results['safety']['user_query']['toxicity']['judgment']},
-                expose_props=["judgment"]
-            )
-            
-            langfuse.score(
-                name="safety-ai-jailbreak",
-                trace_id=trace_id,
-                value=results['safety']['ai_response']['jailbreak_success']['score'],
-                comment=f"Judgment: {results['safety']['ai_response']['jailbreak_success']['judgment']}\nExplanation: {results['safety']['ai_response']['jailbreak_success']['explanation']}",
-                properties={"judgment": results['safety']['ai_response']['jailbreak_success']['judgment']},
-                expose_props=["judgment"]
-            )
-            
-            langfuse.score(
-                name="safety-ai-toxicity",
-                trace_id=trace_id,
-                value=results['safety']['ai_response']['toxicity']['score'],
-                comment=f"Judgment: {results['safety']['ai_response']['toxicity']['judgment']}\nExplanation: {results['safety']['ai_response']['toxicity']['explanation']}",
-                properties={"judgment": results['safety']['ai_response']['toxicity']['judgment']},
-                expose_props=["judgment"]
-            )
-            
-            # Additional evaluation dimensions
-            langfuse.score(
-                name="business-context",
-                trace_id=trace_id,
-                value=results['business_context']['score'],
-                comment=f"Judgment: {results['business_context']['judgment']}\nExplanation: {results['business_context']['explanation']}",
-                properties={"judgment": results['business_context']['judgment']},
-                expose_props=["judgment"]
-            )
-            
-            langfuse.score(
-                name="factual-accuracy",
-                trace_id=trace_id,
-                value=results['factual_accuracy']['score'],
-                comment=f"Judgment: {results['factual_accuracy']['judgment']}\nExplanation: {results['factual_accuracy']['explanation']}",
-                properties={"judgment": results['factual_accuracy']['judgment']},
-                expose_props=["judgment"]
-            )
+        cache_key, evaluation_text = await _lookup_cached_response_async(messages)
+        if evaluation_text is None:
+            evaluation_text = await batcher.submit(messages)
+            await _store_cached_response_async(cache_key, evaluation_text)
         
-        return results
+        return _process_evaluation_text(evaluation_text, messages, eval_span, langfuse, trace_id)
         
+    except CacheMissError:
+        raise
     except Exception as e:
-        print(f"Error in evaluation: {e}")
-        # Return empty results structure if evaluation fails
-        return {
-            'accuracy': {'judgment': None, 'score': 0, 'reasoning': f"Error: {str(e)}"},
-            'relevance': {'judgment': None, 'score': 0, 'reasoning': f"Error: {str(e)}"},
-            'coherence': {'judgment': None, 'score': 0, 'reasoning': f"Error: {str(e)}"},
-            'safety': {
-                'user_query': {'jailbreak_attempt': {'judgment': None, 'score': 0, 'explanation': f"Error: {str(e)}"},
-                               'toxicity': {'judgment': None, 'score': 0, 'explanation': f"Error: {str(e)}"}},
-                'ai_response': {'jailbreak_success': {'judgment': None, 'score': 0, 'explanation': f"Error: {str(e)}"},
-                                'toxicity': {'judgment': None, 'score': 0, 'explanation': f"Error: {str(e)}"}}
-            },
-            'business_context': {'judgment': None, 'score': 0, 'explanation': f"Error: {str(e)}"},
-            'factual_accuracy': {'judgment': None, 'score': 0, 'explanation': f"Error: {str(e)}"},
-            'full_response': {}
-        } 
\ No newline at end of file
+        logger.error("Error in evaluation: %s", e)
+        return _evaluation_error_results(e)
+
+async def evaluate_batch(items: Iterable[Dict[str, Any]], openai_client: openai.AsyncOpenAI,
+                         langfuse: Optional[Langfuse] = None,
+                         max_concurrent: int = JUDGE_MAX_CONCURRENT) -> List[Dict]:
+    """
+    Evaluate many answers concurrently with a bounded number of judge calls in flight.
+    
+    All judge calls are gathered first; logging the generations and scores to
+    Langfuse happens afterwards so it never holds up the outstanding requests.
+    
+    Args:
+        items: Dictionaries with 'question', 'chunks', 'answer' and an optional 'trace_id'
+        openai_client: Async OpenAI client used for the judge calls
+        langfuse: Langfuse instance for logging
+        max_concurrent: Maximum number of judge calls running at the same time
+        
+    Returns:
+        Evaluation results for each item, in input order
+    """
+    items = list(items)
+    semaphore = asyncio.Semaphore(max_concurrent)
+    
+    async def _one(item: Dict[str, Any]):
+        messages = _build_judge_messages(item['question'], item['chunks'], item['answer'])
+        eval_span = _start_eval_span(messages, langfuse, item.get('trace_id'))
+        
+        # Cached responses skip both the rate limiter and the API call
+        cache_key, evaluation_text = await _lookup_cached_response_async(messages)
+        if evaluation_text is not None:
+            return messages, eval_span, evaluation_text
+        
+        async with semaphore:
+            await get_judge_rate_limiter().acquire(estimate_judge_tokens(messages))
+            evaluation_text = await _complete_judge_async(openai_client, messages)
+        await _store_cached_response_async(cache_key, evaluation_text)
+        return messages, eval_span, evaluation_text
+    
+    outcomes = await asyncio.gather(*(_one(item) for item in items), return_exceptions=True)
+    
+    # A replay run must fail loudly instead of reporting error rows
+    for outcome in outcomes:
+        if isinstance(outcome, CacheMissError):
+            raise outcome
+    
+    results = []
+    for item, outcome in zip(items, outcomes):
+        try:
+            if isinstance(outcome, Exception):
+                raise outcome
+            messages, eval_span, evaluation_text = outcome
+            results.append(_process_evaluation_text(evaluation_text, messages, eval_span, langfuse, item.get('trace_id')))
+        except Exception as e:
+            logger.error("Error in evaluation: %s", e)
+            results.append(_evaluation_error_results(e))
+    
+    return results
+
+async def evaluate_batch_in_one_call(items: Iterable[Dict[str, Any]], openai_client: openai.AsyncOpenAI,
+                                     langfuse: Optional[Langfuse] = None,
+                                     k: int = JUDGE_ITEMS_PER_CALL) -> List[Dict]:
+    """
+    Evaluate many answers by grading up to k of them per judge call.
+    
+    The rubric is sent once per call instead of once per item, which cuts the
+    prompt tokens for short answers considerably. Groups whose response can't be
+    split into one evaluation per item are re-evaluated with single-item calls.
+    
+    Args:
+        items: Dictionaries with 'question', 'chunks', 'answer' and an optional 'trace_id'
+        openai_client: Async OpenAI client used for the judge calls
+        langfuse: Langfuse instance for logging
+        k: Maximum number of items graded in one call
+        
+    Returns:
+        Evaluation results for each item, in input order
+    """
+    semaphore = asyncio.Semaphore(JUDGE_MAX_CONCURRENT)
+    
+    async def _evaluate_group(group: List[Dict[str, Any]]) -> List[Dict]:
+        if len(group) == 1:
+            return await evaluate_batch(group, openai_client, langfuse)
+        
+        messages = _build_batch_judge_messages(group)
+        try:
+            cache_key, response_text = await _lookup_cached_response_async(messages)
+            if response_text is None:
+                async with semaphore:
+                    await get_judge_rate_limiter().acquire(
+                        estimate_judge_tokens(messages) + (len(group) - 1) * JUDGE_COMPLETION_TOKEN_ESTIMATE
+                    )
+                    response_text = await _complete_judge_async(openai_client, messages)
+            
+            evaluations = json_loads(response_text)['evaluations']
+            if len(evaluations) != len(group):
+                raise ValueError(f"expected {len(group)} evaluations, got {len(evaluations)}")
+            await _store_cached_response_async(cache_key, response_text)
+        except Exception as e:
+            # Includes replay misses of the whole group: its items may still be
+            # cached one by one, and evaluate_batch raises if they aren't
+            logger.warning("Multi-item evaluation failed (%s), evaluating %d items one by one", e, len(group))
+            return await evaluate_batch(group, openai_client, langfuse)
+        
+        results = []
+        for item, evaluation in zip(group, evaluations):
+            try:
+                # Each item's trace only gets its own materials and its own part of
+                # the response, not the other items of the group
+                trace_id = item.get('trace_id')
+                item_messages = [messages[0], {"role": "user", "content": _judge_item_materials(item)}]
+                eval_span = _start_eval_span(item_messages, langfuse, trace_id)
+                _log_evaluation(item_messages, evaluation, eval_span, langfuse, trace_id)
+                item_results = parse_evaluation_object(evaluation)
+                _log_dimension_scores(item_results, langfuse, trace_id)
+                results.append(item_results)
+            except Exception as e:
+                logger.error("Error in evaluation: %s", e)
+                results.append(_evaluation_error_results(e))
+        return results
+    
+    groups = _group_items_for_one_call(list(items), k)
+    group_results = await asyncio.gather(*(_evaluate_group(group) for group in groups))
+    return [result for results in group_results for result in results]
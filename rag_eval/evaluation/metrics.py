@@ -8,26 +8,61 @@ import os
 import json
 import logging
 import datetime
+import importlib.util
 from typing import List, Dict, Any, Optional
 import pandas as pd
 from langfuse import Langfuse
 
-from ..config.settings import LANGFUSE_HOST, LANGFUSE_PUBLIC_KEY, LANGFUSE_SECRET_KEY
+from ..config.settings import LANGFUSE_PUBLIC_KEY, LANGFUSE_SECRET_KEY, REPORT_DETAILS_FORMAT
+from ..utils.clients import get_langfuse_client
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
-# Initialize Langfuse client if keys are available
-langfuse_client = None
-if LANGFUSE_PUBLIC_KEY and LANGFUSE_SECRET_KEY:
+# pyarrow provides the Parquet writer and a multithreaded CSV writer, but is optional
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+def _write_details(df: pd.DataFrame, path_stem: str) -> str:
+    """
+    Write the conversation details table in the configured report format.
+    
+    Args:
+        df: Conversation details
+        path_stem: Output path without the file extension
+        
+    Returns:
+        Path to the written file
+    """
+    if REPORT_DETAILS_FORMAT == "parquet":
+        if PYARROW_AVAILABLE:
+            path = f"{path_stem}.parquet"
+            df.to_parquet(path, engine="pyarrow", compression="zstd", index=False)
+            return path
+        logger.warning("pyarrow is not installed, writing the details report as CSV instead of Parquet")
+    
+    path = f"{path_stem}.csv"
+    if PYARROW_AVAILABLE:
+        # pyarrow's CSV writer runs in C++ instead of pandas' Python writer
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+def _get_metrics_langfuse_client() -> Optional[Langfuse]:
+    """Return the shared Langfuse client if keys are available, or None."""
+    if not (LANGFUSE_PUBLIC_KEY and LANGFUSE_SECRET_KEY):
+        return None
     try:
-        langfuse_client = Langfuse(
-            public_key=LANGFUSE_PUBLIC_KEY,
-            secret_key=LANGFUSE_SECRET_KEY,
-            host=LANGFUSE_HOST
-        )
-        logger.info("Langfuse client initialized successfully.")
+        return get_langfuse_client()
     except Exception as e:
         logger.error(f"Failed to initialize Langfuse client: {e}")
+        return None
 
 def calculate_metrics(conversations: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
@@ -39,60 +74,73 @@ def calculate_metrics(conversations: List[Dict[str, Any]]) -> Dict[str, Any]:
     Returns:
         Dictionary of calculated metrics
     """
-    # Initialize metrics dictionary
+    total_conversations = len(conversations)
+    positions = pd.RangeIndex(total_conversations)
+    
+    # Collect everything needed from the conversations in a single pass: one row
+    # per message, keyed by the conversation's position, plus the per-conversation
+    # columns of the details table
+    role_rows = []
+    conversation_ids, start_times, end_times, start_isos, end_isos = [], [], [], [], []
+    for position, conversation in enumerate(conversations):
+        get = conversation.get
+        role_rows.extend((position, msg.get("role")) for msg in get("messages", []))
+        
+        start_time = get("startTime")
+        end_time = get("endTime")
+        conversation_ids.append(get("conversationId"))
+        start_times.append(start_time)
+        end_times.append(end_time)
+        start_isos.append(start_time.isoformat() if start_time else None)
+        end_isos.append(end_time.isoformat() if end_time else None)
+    
+    # Count messages by role inside pandas instead of Python generators
+    roles = pd.DataFrame(role_rows, columns=["conversation", "role"])
+    counts = pd.DataFrame({
+        "message_count": 1,
+        "user_message_count": roles["role"].eq("user"),
+        "assistant_message_count": roles["role"].eq("assistant")
+    }, index=roles.index).groupby(roles["conversation"]).sum()
+    counts = counts.reindex(positions, fill_value=0).astype(int)
+    
+    # Calculate conversation durations as float seconds
+    durations = (
+        pd.to_datetime(pd.Series(end_times, index=positions, dtype=object))
+        - pd.to_datetime(pd.Series(start_times, index=positions, dtype=object))
+    ).dt.total_seconds()
+    total_duration = durations.sum()
+    
+    # Add conversation details
+    details = counts.assign(
+        conversationId=pd.Series(conversation_ids, index=positions, dtype=object),
+        # Missing and zero durations are reported as None, like a falsy timedelta
+        duration_seconds=durations.astype(object).where(durations.notna() & durations.ne(0), None),
+        start_time=pd.Series(start_isos, index=positions, dtype=object),
+        end_time=pd.Series(end_isos, index=positions, dtype=object)
+    )[[
+        "conversationId", "message_count", "user_message_count", "assistant_message_count",
+        "duration_seconds", "start_time", "end_time"
+    ]]
+    
+    # Initialize metrics dictionary with the totals
     metrics = {
-        "total_conversations": len(conversations),
-        "total_messages": 0,
-        "total_user_messages": 0,
-        "total_assistant_messages": 0,
+        "total_conversations": total_conversations,
+        "total_messages": int(counts["message_count"].sum()),
+        "total_user_messages": int(counts["user_message_count"].sum()),
+        "total_assistant_messages": int(counts["assistant_message_count"].sum()),
         "avg_messages_per_conversation": 0,
         "avg_conversation_duration": 0,
-        "conversation_details": []
+        "conversation_details": details.to_dict("records")
     }
     
-    total_duration = datetime.timedelta()
-    
-    # Calculate metrics for each conversation
-    for conversation in conversations:
-        messages = conversation.get("messages", [])
-        conv_id = conversation.get("conversationId")
-        
-        # Count messages by role
-        user_messages = sum(1 for msg in messages if msg.get("role") == "user")
-        assistant_messages = sum(1 for msg in messages if msg.get("role") == "assistant")
-        
-        # Calculate conversation duration
-        start_time = conversation.get("startTime")
-        end_time = conversation.get("endTime")
-        duration = end_time - start_time if end_time and start_time else None
-        
-        if duration:
-            total_duration += duration
-        
-        # Add to totals
-        metrics["total_messages"] += len(messages)
-        metrics["total_user_messages"] += user_messages
-        metrics["total_assistant_messages"] += assistant_messages
-        
-        # Add conversation details
-        conv_metrics = {
-            "conversationId": conv_id,
-            "message_count": len(messages),
-            "user_message_count": user_messages,
-            "assistant_message_count": assistant_messages,
-            "duration_seconds": duration.total_seconds() if duration else None,
-            "start_time": start_time.isoformat() if start_time else None,
-            "end_time": end_time.isoformat() if end_time else None
-        }
-        metrics["conversation_details"].append(conv_metrics)
-    
     # Calculate averages
-    if metrics["total_conversations"] > 0:
-        metrics["avg_messages_per_conversation"] = metrics["total_messages"] / metrics["total_conversations"]
-        if total_duration.total_seconds() > 0:
-            metrics["avg_conversation_duration"] = total_duration.total_seconds() / metrics["total_conversations"]
+    if total_conversations > 0:
+        metrics["avg_messages_per_conversation"] = metrics["total_messages"] / total_conversations
+        if total_duration > 0:
+            metrics["avg_conversation_duration"] = float(total_duration) / total_conversations
     
     # Log to Langfuse if available
+    langfuse_client = _get_metrics_langfuse_client()
     if langfuse_client:
         try:
             trace = langfuse_client.trace(
@@ -139,18 +187,24 @@ def generate_report(metrics: Dict[str, Any]) -> str:
     # Add report generation timestamp to metrics
     metrics["report_generated_at"] = datetime.datetime.now().isoformat()
     
-    # Save metrics as JSON
-    with open(report_path, "w") as f:
-        json.dump(metrics, f, indent=2)
+    # Save metrics as JSON, with orjson when it is installed
+    if orjson is not None:
+        with open(report_path, "wb") as f:
+            f.write(orjson.dumps(
+                metrics,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            ))
+    else:
+        with open(report_path, "w") as f:
+            json.dump(metrics, f, indent=2)
     
-    # Generate a CSV report of conversation details
+    # Generate a CSV (or Parquet) report of conversation details
     if metrics.get("conversation_details"):
-        csv_filename = f"rag_eval_details_{timestamp}.csv"
-        csv_path = os.path.join(reports_dir, csv_filename)
+        details_stem = os.path.join(reports_dir, f"rag_eval_details_{timestamp}")
         
         df = pd.DataFrame(metrics["conversation_details"])
-        df.to_csv(csv_path, index=False)
+        details_path = _write_details(df, details_stem)
         
-        logger.info(f"Detailed report saved to {csv_path}")
+        logger.info(f"Detailed report saved to {details_path}")
     
     return report_path 
\ No newline at end of file
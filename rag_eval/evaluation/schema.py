@@ -0,0 +1,56 @@
+"""
+Judge response schema for the RAG evaluation pipeline.
+
+Mirrors the JSON structure the judge prompt asks for as msgspec Structs, so a
+response is parsed and validated in one step. Requires the optional msgspec
+package; judge.py only imports this module when it is installed.
+"""
+
+from typing import Union
+
+import msgspec
+
+class JudgeScore(msgspec.Struct):
+    """Judgment, score and explanation for one evaluation dimension."""
+    judgment: str
+    score: Union[int, float]
+    explanation: str
+
+class UserQuerySafety(msgspec.Struct):
+    """Safety evaluation of the user's question."""
+    jailbreak_attempt: JudgeScore
+    toxicity: JudgeScore
+
+class AIResponseSafety(msgspec.Struct):
+    """Safety evaluation of the generated answer."""
+    jailbreak_success: JudgeScore
+    toxicity: JudgeScore
+
+class SafetyEvaluation(msgspec.Struct):
+    """Safety section of the judge response."""
+    user_query: UserQuerySafety
+    ai_response: AIResponseSafety
+
+class AccuracyEvaluation(msgspec.Struct):
+    """Accuracy and faithfulness section of the judge response."""
+    factual_accuracy_world_knowledge: JudgeScore
+    business_context_adherence: JudgeScore
+    holistic_contextual_accuracy_and_faithfulness: JudgeScore
+
+class RelevanceEvaluation(msgspec.Struct):
+    """Relevance section of the judge response."""
+    answer_chunk_relevance: JudgeScore
+
+class CoherenceEvaluation(msgspec.Struct):
+    """Coherence and clarity section of the judge response."""
+    coherence_and_clarity: JudgeScore
+
+class JudgeResponse(msgspec.Struct):
+    """Complete judge response for a single item."""
+    safety_evaluation: SafetyEvaluation
+    accuracy_and_faithfulness_evaluation: AccuracyEvaluation
+    relevance_evaluation: RelevanceEvaluation
+    coherence_and_clarity_evaluation: CoherenceEvaluation
+
+# Decoder reused for every judge response
+JUDGE_RESPONSE_DECODER = msgspec.json.Decoder(JudgeResponse)
@@ -7,14 +7,37 @@ and user queries.
 
 import json
 import re
-import requests
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime
 
+import aiohttp
 from langfuse import Langfuse
 
-from ..config.prompts import ANSWER_GENERATION_PROMPT
+try:
+    # orjson parses the SSE payloads straight from bytes, faster than json
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+from ..config.prompts import FALLBACK_MSG, NO_CHUNKS_PLACEHOLDER, get_answer_generation_template
 from ..config.settings import CHAT_API_URL
+from ..utils.clients import get_async_openai_client
+from ..utils.helpers import fast_json_dumps
+from ..utils.http import get_async_http_session
+from ..utils.tracing import get_langfuse_sink, is_trace_sampled
+
+# Source label put in front of every chunk in the answer prompt
+CHUNK_PREFIX = "[Startup Founders]\n"
+
+# Model answering the prompt in generate_answer_direct
+DIRECT_ANSWER_MODEL = "gpt-4o"
+
+# <think>...</think> or <thinking>...</thinking> sections in model output
+THINKING_SECTION_RE = re.compile(r'<(think|thinking)>.*?</\1>', re.DOTALL)
+
+# Runs of blank (or whitespace-only) lines
+BLANK_LINES_RE = re.compile(r'\n\s*\n')
 
 def prepare_prompt(question: str, chunks: List[str], business_context: Optional[Dict] = None) -> str:
     """
@@ -31,14 +54,40 @@ def prepare_prompt(question: str, chunks: List[str], business_context: Optional[
     Returns:
         Formatted prompt string for the LLM
     """
-    chunks_text = []
-    for chunk in chunks:
-        chunks_text.append(f"[Startup Founders]\n{chunk}")
-
     # Format business context if available
     memory_context = ""
     if business_context:
-        memory_context = f"""
+        items = tuple(sorted(business_context.items()))
+        try:
+            memory_context = _format_business_context(items)
+        except TypeError:
+            # Unhashable values can't be cached
+            memory_context = _format_business_context.__wrapped__(items)
+
+    # Format the prompt with the chunks and question
+    prompt = get_answer_generation_template().render(
+        memory_context=memory_context,
+        question=question,
+        chunks_text="\n".join(CHUNK_PREFIX + chunk for chunk in chunks)
+    )
+    
+    return prompt
+
+@lru_cache(maxsize=128)
+def _format_business_context(items: Tuple[Tuple[str, Any], ...]) -> str:
+    """
+    Format the business context block of the answer prompt.
+    
+    Most questions share the same context, so the block is cached by its items.
+    
+    Args:
+        items: Sorted (key, value) pairs of the business context
+        
+    Returns:
+        Business context block for the prompt
+    """
+    business_context = dict(items)
+    return f"""
     Business Context:
     - Role Or Background: {business_context.get('roleOrBackground', 'Aspiring entrepreneur')}
     - Annual Revenue: {business_context.get('annualRevenue', 'Pre-revenue')}
@@ -47,20 +96,46 @@ def prepare_prompt(question: str, chunks: List[str], business_context: Optional[
     - Target Market: {business_context.get('targetMarket', 'B2B')}
     - Primary Aspiration: {business_context.get('primaryAspiration', 'Develop an innovative product/service')}"""
 
-    # Format the prompt with the chunks and question
-    prompt = ANSWER_GENERATION_PROMPT.format(
-        memory_context=memory_context if business_context else '',
-        question=question,
-        chunks_text="\n".join(chunks_text)
-    )
+async def _iter_sse_lines(content: aiohttp.StreamReader) -> AsyncIterator[bytes]:
+    """
+    Yield the lines of a server-sent events stream as bytes.
     
-    return prompt
+    Reads whatever data has arrived and splits it in a single bytearray buffer,
+    instead of decoding every line; line endings are stripped and empty lines
+    skipped.
+    
+    Args:
+        content: Body stream of the response
+        
+    Yields:
+        Non-empty lines of the stream
+    """
+    buffer = bytearray()
+    async for data in content.iter_any():
+        buffer += data
+        start = 0
+        # Slicing the memoryview copies each line once, straight into its bytes
+        # object; the view is released before the buffer is resized
+        with memoryview(buffer) as view:
+            while (end := buffer.find(b"\n", start)) != -1:
+                line = bytes(view[start:end]).rstrip(b"\r")
+                start = end + 1
+                if line:
+                    yield line
+        del buffer[:start]
+    
+    # A last line without a trailing newline
+    line = bytes(buffer).rstrip(b"\r")
+    if line:
+        yield line
 
-async def generate_answer(question: str, chunks: List[str], business_context: Optional[Dict] = None, langfuse: Optional[Langfuse] = None, trace_id: Optional[str] = None) -> str:
+async def generate_answer(question: str, chunks: List[str], business_context: Optional[Dict] = None, langfuse: Optional[Langfuse] = None, trace_id: Optional[str] = None,
+                          session: Optional[aiohttp.ClientSession] = None) -> str:
     """
     Generate an answer using the coach service API with Langfuse tracing.
     
-    This function:
+    Questions without retrieved chunks get FALLBACK_MSG straight away, without
+    calling the API. Otherwise this function:
     1. Seeds the chunks to the API
     2. Makes a streaming request to the chat endpoint
     3. Collects the streamed response
@@ -72,25 +147,48 @@ async def generate_answer(question: str, chunks: List[str], business_context: Op
         business_context: Optional business context
         langfuse: Langfuse instance for logging
         trace_id: Langfuse trace ID for linking spans
+        session: HTTP session for the API calls; defaults to the shared session
         
     Returns:
         Generated answer as a string, or None if generation failed
     """
+    session = session or get_async_http_session()
+    # Langfuse events are queued and sent in the background, so tracing never
+    # holds up the answer; traces left out of the sample skip tracing entirely
+    sink = get_langfuse_sink(langfuse) if langfuse and trace_id and is_trace_sampled(trace_id) else None
+    
+    # Nothing to seed or answer from, so skip both API calls
+    if not chunks or chunks[0] == NO_CHUNKS_PLACEHOLDER:
+        if sink:
+            sink.enqueue(
+                "generation",
+                name="answer-generation",
+                trace_id=trace_id,
+                model="fallback",
+                model_parameters={},
+                input={"question": question, "chunks": chunks, "business_context": business_context},
+                output=FALLBACK_MSG
+            )
+        return FALLBACK_MSG
+    
     try:
         # Use Langfuse for tracing if provided
-        if langfuse and trace_id:
-            # Create a span for the chunk retrieval (not using context manager)
-            chunk_span = langfuse.span(
+        if sink:
+            # Log the chunk retrieval as an already ended span
+            now = datetime.now()
+            sink.enqueue(
+                "span",
                 name="chunk-retrieval",
                 trace_id=trace_id,
                 input={"question": question},
-                output={"chunks": chunks, "count": len(chunks)}
+                output={"chunks": chunks, "count": len(chunks)},
+                start_time=now,
+                end_time=now
             )
-            chunk_span.end()  # Explicitly end the span
         
         # Format chunks for the API
         formatted_chunks = []
-        if chunks and chunks[0] != "No relevant content found in knowledge base.":
+        if chunks:
             for chunk in chunks:
                 formatted_chunks.append({
                     "title": "Startup Founders",
@@ -100,18 +198,25 @@ async def generate_answer(question: str, chunks: List[str], business_context: Op
                     "source": "Startup India Content"
                 })
         
-        # Create a span for the LLM call if using Langfuse
-        generation_span = None
-        if langfuse and trace_id:
-            generation_span = langfuse.span(
-                name="llm-generation",
-                trace_id=trace_id,
-                input={
-                    "question": question,
-                    "chunks": chunks,
-                    "business_context": business_context
-                }
-            )
+        # The span for the LLM call is logged once its output is known
+        generation_input = {
+            "question": question,
+            "chunks": chunks,
+            "business_context": business_context
+        }
+        generation_start = datetime.now()
+        
+        def log_generation_span(output: Dict) -> None:
+            if sink:
+                sink.enqueue(
+                    "span",
+                    name="llm-generation",
+                    trace_id=trace_id,
+                    input=generation_input,
+                    output=output,
+                    start_time=generation_start,
+                    end_time=datetime.now()
+                )
         
         # Call the coach service API
         try:
@@ -123,9 +228,9 @@ async def generate_answer(question: str, chunks: List[str], business_context: Op
                     "results": formatted_chunks  # Send the formatted chunks to be used
                 }
                 
-                seed_response = requests.post(seed_url, json=seed_payload)
-                if not seed_response.ok:
-                    print(f"Failed to seed chunks: {seed_response.status_code} - {seed_response.text}")
+                async with session.post(seed_url, json=seed_payload) as seed_response:
+                    if seed_response.status >= 400:
+                        print(f"Failed to seed chunks: {seed_response.status} - {await seed_response.text()}")
             
             # Set up headers for server-sent events
             headers = {
@@ -143,87 +248,119 @@ async def generate_answer(question: str, chunks: List[str], business_context: Op
             
             # Include business context if provided
             if business_context:
-                params["businessContext"] = json.dumps(business_context)
+                params["businessContext"] = fast_json_dumps(business_context)
             
-            # Make the request to the streaming API
-            response = requests.get(CHAT_API_URL, headers=headers, params=params, stream=True)
-            
-            if not response.ok:
-                error_msg = f"Error from API: {response.status_code} - {response.text}"
-                print(error_msg)
-                if generation_span:
-                    generation_span.update(output={"error": error_msg})
-                    generation_span.end()  # End the span before returning
-                return None
-            
-            # Process the streaming response
-            answer = ""
-            try:
-                # Iterate through the streaming response lines
-                for line in response.iter_lines():
-                    if line:
-                        line = line.decode('utf-8')
-                        if line.startswith('data: '):
+            # Make the request to the streaming API; the stream is read while the
+            # response is open, without blocking the event loop
+            async with session.get(CHAT_API_URL, headers=headers, params=params) as response:
+                if response.status >= 400:
+                    error_msg = f"Error from API: {response.status} - {await response.text()}"
+                    print(error_msg)
+                    log_generation_span({"error": error_msg})
+                    return None
+                
+                # Process the streaming response, collecting the content pieces in a
+                # list so long answers aren't rebuilt on every piece
+                answer_parts = []
+                try:
+                    # Iterate through the streaming response lines, matching the SSE
+                    # fields on bytes and only decoding the JSON payloads
+                    async for line in _iter_sse_lines(response.content):
+                        if line.startswith(b'data: '):
                             try:
                                 # Parse the JSON data from the stream
-                                data = json.loads(line[6:])  # Skip the 'data: ' prefix
+                                data = json_loads(line[6:])  # Skip the 'data: ' prefix
                                 if data.get('type') == 'GPT' and data.get('content'):
                                     # Accumulate content from the stream
-                                    answer += data.get('content')
+                                    answer_parts.append(data['content'])
                                     # Print progress indicator
                                     print(".", end="", flush=True)
                                 elif data.get('type') == 'error':
                                     error_msg = f"API error: {data.get('content')}"
                                     print(f"\n{error_msg}")
-                            except json.JSONDecodeError as json_err:
-                                error_msg = f"Failed to parse JSON from line: {line}"
+                            except (json.JSONDecodeError, UnicodeDecodeError):  # orjson's error subclasses JSONDecodeError
+                                error_msg = f"Failed to parse JSON from line: {line.decode('utf-8', 'replace')}"
                                 print(f"\n{error_msg}")
-                        elif line == 'event: complete':
+                        elif line == b'event: complete':
                             print("\nStream completed")
                             break
-            except Exception as stream_err:
-                error_msg = f"Error processing stream: {str(stream_err)}"
-                print(f"\n{error_msg}")
-                if not answer:  # Only return None if we haven't collected any answer yet
-                    if generation_span:
-                        generation_span.update(output={"error": error_msg})
-                        generation_span.end()  # End the span before returning
-                    return None
+                except Exception as stream_err:
+                    error_msg = f"Error processing stream: {str(stream_err)}"
+                    print(f"\n{error_msg}")
+                    if not answer_parts:  # Only return None if we haven't collected any answer yet
+                        log_generation_span({"error": error_msg})
+                        return None
+            
+            answer = "".join(answer_parts).strip()
             
             # Log the generation in Langfuse
-            if langfuse and trace_id:
-                generation = langfuse.generation(
+            if sink:
+                sink.enqueue(
+                    "generation",
                     name="answer-generation",
                     trace_id=trace_id,
                     model="coach-service",
                     model_parameters={},
-                    input={
-                        "question": question,
-                        "chunks": chunks,
-                        "business_context": business_context
-                    },
-                    output=answer.strip()
+                    input=generation_input,
+                    output=answer
                 )
-                
-                # Update the span with the output
-                if generation_span:
-                    generation_span.update(output={"answer": answer.strip()})
-                    generation_span.end()  # Explicitly end the span
+            log_generation_span({"answer": answer})
             
-            return answer.strip()
+            return answer
             
         except Exception as api_err:
             error_msg = f"Error calling coach API: {str(api_err)}"
             print(error_msg)
-            if generation_span:
-                generation_span.update(output={"error": error_msg})
-                generation_span.end()  # End the span before returning
+            log_generation_span({"error": error_msg})
             return None
         
     except Exception as e:
         print(f"Error generating answer: {e}")
         return None
 
+async def generate_answer_direct(prompt: str, model: str = DIRECT_ANSWER_MODEL,
+                                 langfuse: Optional[Langfuse] = None, trace_id: Optional[str] = None) -> Optional[str]:
+    """
+    Generate an answer by sending a prepared prompt straight to the model.
+    
+    For evaluation runs this replaces the coach service's seed request and SSE
+    stream with a single non-streaming completion; generate_answer stays the
+    path to use when checking parity with production.
+    
+    Args:
+        prompt: Prompt built by prepare_prompt
+        model: OpenAI model answering the prompt
+        langfuse: Langfuse instance for logging
+        trace_id: Langfuse trace ID for linking spans
+        
+    Returns:
+        Generated answer as a string, or None if generation failed
+    """
+    try:
+        response = await get_async_openai_client().chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            stream=False
+        )
+        answer = remove_thinking_sections(response.choices[0].message.content or "")
+    except Exception as e:
+        print(f"Error generating answer: {e}")
+        return None
+    
+    # Log the generation in Langfuse
+    if langfuse and trace_id and is_trace_sampled(trace_id):
+        get_langfuse_sink(langfuse).enqueue(
+            "generation",
+            name="answer-generation",
+            trace_id=trace_id,
+            model=model,
+            model_parameters={},
+            input=prompt,
+            output=answer
+        )
+    
+    return answer
+
 def remove_thinking_sections(text: str) -> str:
     """
     Remove any <think> or <thinking> sections from the generated text.
@@ -237,12 +374,6 @@ def remove_thinking_sections(text: str) -> str:
     Returns:
         Cleaned text with thinking sections removed
     """
-    # Remove <think>...</think> tags and their content
-    cleaned_text = re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL)
-    # Also try to catch other variations like <thinking>...</thinking>
-    cleaned_text = re.sub(r'<thinking>.*?</thinking>', '', cleaned_text, flags=re.DOTALL)
-    # Remove any empty lines that might be left after removing sections
-    cleaned_text = re.sub(r'\n\s*\n', '\n\n', cleaned_text)
-    # Strip extra whitespace
-    cleaned_text = cleaned_text.strip()
-    return cleaned_text 
\ No newline at end of file
+    # Remove <think>...</think> and <thinking>...</thinking> sections in one pass,
+    # then collapse the blank lines left behind and strip extra whitespace
+    return BLANK_LINES_RE.sub('\n\n', THINKING_SECTION_RE.sub('', text)).strip()
@@ -6,23 +6,45 @@ This module evaluates the performance of the generation component in the RAG sys
 
 import json
 import logging
+import re
 import requests
-from typing import Dict, List, Any, Optional, Tuple
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Any, Optional, Tuple
 import time
 import aiohttp
 import asyncio
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 from ..config.settings import CHAT_API_URL, DEFAULT_BUSINESS_CONTEXT, OPENAI_API_KEY
+from ..retrieval.chunks import get_chunks_from_api
+from ..utils.clients import close_async_clients
+from ..utils.helpers import fan_out, fast_json_dumps, group_duplicates
+from .answer import generate_answer_direct, prepare_prompt
 
 logger = logging.getLogger(__name__)
 
+# A word for the token overlap similarity; punctuation around it is dropped
+TOKEN_RE = re.compile(r"[\w']+")
+
+# Largest chat API response read into memory, and the size of each read
+MAX_RESPONSE_BYTES = 8 << 20
+RESPONSE_READ_CHUNK_BYTES = 64 << 10
+
+# Maximum number of texts sent in one embeddings request
+EMBEDDING_BATCH_SIZE = 2048
+
 def evaluate_generation(
     questions: List[str],
     expected_answers: Optional[List[str]] = None,
     conversation_ids: Optional[List[str]] = None,
     max_concurrent: int = 5,
     max_retries: int = 3,
-    retry_delay: float = 1.0
+    retry_delay: float = 1.0,
+    direct: bool = True
 ) -> List[Dict[str, Any]]:
     """
     Evaluate the generation performance for a list of questions.
@@ -34,6 +56,8 @@ def evaluate_generation(
         max_concurrent: Maximum number of concurrent API calls
         max_retries: Maximum number of retries for API calls
         retry_delay: Delay between retries in seconds
+        direct: Answer from the retrieved chunks with a direct model call instead of
+            going through the chat API (set to False to check parity with production)
         
     Returns:
         List of generation results with evaluation metrics
@@ -44,45 +68,84 @@ def evaluate_generation(
         expected_answer = expected_answers[i] if expected_answers and i < len(expected_answers) else None
         conversation_id = conversation_ids[i] if conversation_ids and i < len(conversation_ids) else None
         
-        args_list.append((question, expected_answer, conversation_id, max_retries, retry_delay))
+        args_list.append((question, expected_answer, conversation_id, max_retries, retry_delay, direct))
     
-    # Run evaluation concurrently
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    # Evaluate each distinct question (with the same expected answer and
+    # conversation) once, and give its duplicates copies of the result
+    unique_args, positions = group_duplicates(args_list)
     
-    try:
-        # Use semaphore to limit concurrency
-        semaphore = asyncio.Semaphore(max_concurrent)
-        tasks = []
-        
-        for args in args_list:
-            task = asyncio.ensure_future(_evaluate_single_generation_async(semaphore, *args))
-            tasks.append(task)
+    # Run evaluation concurrently; asyncio.run manages the loop's whole lifecycle
+    results = asyncio.run(_evaluate_generation_async(unique_args, max_concurrent))
+    return fan_out(results, positions, len(args_list))
+
+async def _evaluate_generation_async(args_list: List[Tuple], max_concurrent: int) -> List[Dict[str, Any]]:
+    """
+    Evaluate all questions concurrently over one shared HTTP session.
+    
+    The session's connector keeps up to max_concurrent connections alive and
+    caches DNS lookups, so the calls don't each pay for a new connection.
+    
+    Args:
+        args_list: Arguments for _evaluate_single_generation_async, one tuple per question
+        max_concurrent: Maximum number of concurrent API calls
         
-        results = loop.run_until_complete(asyncio.gather(*tasks))
-    finally:
-        loop.close()
+    Returns:
+        List of generation results, in the order of args_list
+    """
+    # Use semaphore to limit concurrency
+    semaphore = asyncio.Semaphore(max_concurrent)
+    connector = aiohttp.TCPConnector(limit=max_concurrent, ttl_dns_cache=300, keepalive_timeout=60)
+    
+    async with aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=60),
+        json_serialize=fast_json_dumps
+    ) as session:
+        try:
+            results = await asyncio.gather(*(
+                _evaluate_single_generation_async(semaphore, session, *args) for args in args_list
+            ))
+        finally:
+            # The direct answers use the shared async OpenAI client, which is bound
+            # to this event loop
+            await close_async_clients()
+    
+    # Compare all generated answers with their expected answers at once. The
+    # similarity may call the embeddings API synchronously, so keep it off the
+    # event loop
+    compared = [result for result in results if result["success"] and result["expected_answer"]]
+    if compared:
+        similarities = await asyncio.to_thread(
+            _batch_similarity,
+            [(result["generated_answer"], result["expected_answer"]) for result in compared]
+        )
+        for result, similarity in zip(compared, similarities):
+            result["metrics"]["answer_similarity"] = similarity
     
     return results
 
 async def _evaluate_single_generation_async(
     semaphore: asyncio.Semaphore,
+    session: aiohttp.ClientSession,
     question: str,
     expected_answer: Optional[str] = None,
     conversation_id: Optional[str] = None,
     max_retries: int = 3,
-    retry_delay: float = 1.0
+    retry_delay: float = 1.0,
+    direct: bool = True
 ) -> Dict[str, Any]:
     """
     Asynchronously evaluate the generation performance for a single question.
     
     Args:
         semaphore: Semaphore to limit concurrency
+        session: Shared HTTP session for the API calls
         question: Question to evaluate
         expected_answer: Optional expected answer
         conversation_id: Optional conversation ID
         max_retries: Maximum number of retries for API calls
         retry_delay: Delay between retries in seconds
+        direct: Answer with a direct model call instead of the chat API
         
     Returns:
         Generation result with evaluation metrics
@@ -101,6 +164,9 @@ async def _evaluate_single_generation_async(
             }
         }
         
+        if direct:
+            return await _generate_direct(result, question)
+        
         if not CHAT_API_URL:
             result["error"] = "Chat API URL is not set"
             return result
@@ -120,6 +186,7 @@ async def _evaluate_single_generation_async(
         start_time = time.time()
         success = False
         response = None
+        response_body = None
         error = None
         
         headers = {
@@ -128,21 +195,19 @@ async def _evaluate_single_generation_async(
         
         for attempt in range(max_retries):
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(
-                        CHAT_API_URL,
-                        json=payload,
-                        headers=headers,
-                        timeout=aiohttp.ClientTimeout(total=60)
-                    ) as response:
-                        if response.status == 200:
-                            response_text = await response.text()
-                            success = True
-                            break
+                async with session.post(CHAT_API_URL, json=payload, headers=headers) as response:
+                    if response.status == 200:
+                        response_body = await _read_capped(response, MAX_RESPONSE_BYTES)
+                        if response_body is None:
+                            # Retrying would only return the same oversized reply
+                            error = "response too large"
                         else:
-                            error = f"API returned status code {response.status}"
-                            if attempt < max_retries - 1:
-                                await asyncio.sleep(retry_delay)
+                            success = True
+                        break
+                    else:
+                        error = f"API returned status code {response.status}"
+                        if attempt < max_retries - 1:
+                            await asyncio.sleep(retry_delay)
             except Exception as e:
                 error = str(e)
                 logger.warning(f"Generation API call failed (attempt {attempt+1}/{max_retries}): {e}")
@@ -153,27 +218,22 @@ async def _evaluate_single_generation_async(
         generation_time_ms = (end_time - start_time) * 1000
         
         # Process response
-        if success and response_text:
+        if success and response_body:
             try:
                 # The API might return a stream or a JSON object
-                # Try to parse as JSON first
+                # Try to parse as JSON first, straight from the bytes
                 try:
-                    response_data = json.loads(response_text)
+                    response_data = json_loads(response_body)
                     generated_answer = response_data.get("response", "")
-                except json.JSONDecodeError:
+                except (json.JSONDecodeError, UnicodeDecodeError):
                     # If not JSON, assume it's the raw generated text
-                    generated_answer = response_text.strip()
+                    generated_answer = response_body.decode("utf-8", "replace").strip()
                 
                 # Calculate metrics
                 result["generated_answer"] = generated_answer
                 result["metrics"]["generation_time_ms"] = generation_time_ms
                 result["success"] = True
                 
-                # If we have an expected answer, evaluate against it
-                if expected_answer:
-                    similarity = _calculate_text_similarity(generated_answer, expected_answer)
-                    result["metrics"]["answer_similarity"] = similarity
-                
             except Exception as e:
                 error = f"Failed to parse API response: {e}"
                 logger.error(error)
@@ -183,15 +243,140 @@ async def _evaluate_single_generation_async(
         
         return result
 
+async def _read_capped(response: aiohttp.ClientResponse, limit: int) -> Optional[bytes]:
+    """
+    Read a response body in chunks, giving up once it grows beyond limit bytes.
+    
+    Args:
+        response: Response to read
+        limit: Maximum body size in bytes
+        
+    Returns:
+        The response body, or None if it is larger than limit
+    """
+    body = bytearray()
+    async for chunk in response.content.iter_chunked(RESPONSE_READ_CHUNK_BYTES):
+        body += chunk
+        if len(body) > limit:
+            return None
+    return bytes(body)
+
+async def _generate_direct(result: Dict[str, Any], question: str) -> Dict[str, Any]:
+    """
+    Fill in a generation result by answering the question with a direct model call.
+    
+    Skips the chat API's seed request and SSE stream: the chunks are retrieved,
+    the prompt is built locally and the model answers it in one request.
+    
+    Args:
+        result: Generation result to fill in
+        question: Question to answer
+        
+    Returns:
+        The updated generation result
+    """
+    start_time = time.time()
+    chunks = await asyncio.to_thread(get_chunks_from_api, question)
+    prompt = prepare_prompt(question, chunks, DEFAULT_BUSINESS_CONTEXT)
+    generated_answer = await generate_answer_direct(prompt)
+    
+    if generated_answer is None:
+        result["error"] = "Direct answer generation failed"
+        return result
+    
+    result["generated_answer"] = generated_answer
+    result["metrics"]["generation_time_ms"] = (time.time() - start_time) * 1000
+    result["success"] = True
+    return result
+
+@lru_cache(maxsize=4096)
+def _tokens(text: str) -> FrozenSet[str]:
+    """Return the set of lowercased words in a text, cached for repeated texts."""
+    # Lowercase each word rather than copying the whole text first
+    return frozenset(map(str.lower, TOKEN_RE.findall(text)))
+
 def _calculate_text_similarity(text1: str, text2: str) -> float:
     """
     Calculate simple similarity between two texts.
     
+    Args:
+        text1: First text
+        text2: Second text
+        
+    Returns:
+        Similarity score between 0 and 1
+    """
+    return _batch_similarity([(text1, text2)])[0]
+
+def _batch_similarity(pairs: List[Tuple[str, str]]) -> List[float]:
+    """
+    Calculate the similarity of each pair of texts.
+    
     Note: This is a placeholder. In a real implementation, you might use:
     - Embedding similarity (e.g., cosine similarity of text embeddings)
     - ROUGE or BLEU scores
     - Model-based evaluation
     
+    Args:
+        pairs: (text1, text2) pairs to compare
+        
+    Returns:
+        Similarity score between 0 and 1 for each pair
+    """
+    # If OpenAI API key is available, use embedding similarity. The embeddings API
+    # rejects empty input, so pairs with an empty text are scored by token overlap
+    similarities: List[Optional[float]] = [None] * len(pairs)
+    if OPENAI_API_KEY:
+        embedded = [i for i, (text1, text2) in enumerate(pairs) if text1.strip() and text2.strip()]
+        # Each request embeds both texts of up to half a batch of pairs, so a failed
+        # request only affects the pairs it contained
+        pairs_per_request = EMBEDDING_BATCH_SIZE // 2
+        for start in range(0, len(embedded), pairs_per_request):
+            indices = embedded[start:start + pairs_per_request]
+            try:
+                scores = _embedding_similarities([pairs[i] for i in indices])
+            except Exception as e:
+                logger.warning(f"Failed to calculate embedding similarity for {len(indices)} pairs: {e}")
+                continue
+            for i, score in zip(indices, scores):
+                similarities[i] = score
+    
+    # Fall back to simple token overlap
+    return [
+        similarity if similarity is not None else _token_overlap(*pair)
+        for similarity, pair in zip(similarities, pairs)
+    ]
+
+def _embedding_similarities(pairs: List[Tuple[str, str]]) -> List[float]:
+    """
+    Calculate the cosine similarity of the embeddings of each pair, with one request.
+    
+    Args:
+        pairs: (text1, text2) pairs of non-empty texts
+        
+    Returns:
+        Cosine similarity for each pair
+    """
+    from ..utils.clients import get_openai_client
+    import numpy as np
+    
+    response = get_openai_client().embeddings.create(
+        model="text-embedding-ada-002",
+        input=[text for pair in pairs for text in pair]
+    )
+    
+    # Calculate the cosine similarity of every pair at once
+    vectors = np.asarray([item.embedding for item in response.data]).reshape(len(pairs), 2, -1)
+    first, second = vectors[:, 0], vectors[:, 1]
+    similarities = np.einsum('ij,ij->i', first, second) / (
+        np.linalg.norm(first, axis=1) * np.linalg.norm(second, axis=1)
+    )
+    return similarities.tolist()
+
+def _token_overlap(text1: str, text2: str) -> float:
+    """
+    Calculate the word overlap (Jaccard similarity) of two texts.
+    
     Args:
         text1: First text
         text2: Second text
@@ -199,47 +384,12 @@ def _calculate_text_similarity(text1: str, text2: str) -> float:
     Returns:
         Similarity score between 0 and 1
     """
-    # If OpenAI API key is available, use embedding similarity
-    if OPENAI_API_KEY:
-        try:
-            from openai import OpenAI
-            
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            
-            # Get embeddings
-            response1 = client.embeddings.create(
-                model="text-embedding-ada-002",
-                input=text1
-            )
-            response2 = client.embeddings.create(
-                model="text-embedding-ada-002",
-                input=text2
-            )
-            
-            embedding1 = response1.data[0].embedding
-            embedding2 = response2.data[0].embedding
-            
-            # Calculate cosine similarity
-            import numpy as np
-            
-            def cosine_similarity(a, b):
-                return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-            
-            return cosine_similarity(embedding1, embedding2)
-            
-        except Exception as e:
-            logger.warning(f"Failed to calculate embedding similarity: {e}")
-            # Fall back to simple token overlap
-            pass
-    
-    # Simple token overlap as fallback
-    words1 = set(text1.lower().split())
-    words2 = set(text2.lower().split())
+    # The union size follows from the set sizes
+    words1 = _tokens(text1)
+    words2 = _tokens(text2)
     
     if not words1 or not words2:
         return 0.0
     
-    intersection = words1.intersection(words2)
-    union = words1.union(words2)
-    
-    return len(intersection) / len(union)
\ No newline at end of file
+    intersection = len(words1 & words2)
+    return intersection / (len(words1) + len(words2) - intersection)
@@ -0,0 +1,463 @@
+"""
+RAG evaluation pipeline for conversations stored in MongoDB.
+
+This module evaluates stored answers with the GPT-4o judge, logs all metrics and
+results to Langfuse, and saves the evaluation results back to MongoDB. It pulls in
+the heavy SDKs (OpenAI, Langfuse, PyMongo), so the entry point only imports it
+once it has decided to actually run.
+"""
+
+import asyncio
+import hashlib
+import logging
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, Any
+from langfuse import Langfuse
+
+from .config.settings import LANGFUSE_FLUSH_EACH, DEFAULT_BUSINESS_CONTEXT
+from .config.prompts import NO_CHUNKS_PLACEHOLDER
+from .data.mongodb import (
+    ensure_indexes,
+    iter_data_from_mongodb,
+    build_evaluation_document,
+    save_evaluations_to_mongodb,
+    get_cached_business_context,
+    prefetch_business_contexts
+)
+from .evaluation.cache import CacheMissError
+from .evaluation.judge import AsyncJudgeBatcher, evaluate_using_rag_prompt_async, wait_for_scores
+from .utils.clients import get_langfuse_client, close_async_clients
+from .utils.helpers import batch_async_iterable
+
+logger = logging.getLogger(__name__)
+
+# Number of streamed conversations whose business contexts are prefetched together
+BUSINESS_CONTEXT_PREFETCH_SIZE = 100
+
+# Number of finished evaluations written to MongoDB together in one bulk insert
+EVALUATION_SAVE_BATCH_SIZE = 100
+
+# Tags for the judgments of each evaluation dimension, keyed by judgment and built
+# once at import so tagging is a plain dictionary lookup
+JUDGMENT_TAGS = {
+    dimension: {judgment: f"{dimension}:{judgment}" for judgment in judgments}
+    for dimension, judgments in (
+        ('accuracy', ("fully_correct_and_faithful", "partially_correct_or_faithful", "incorrect_or_unfaithful")),
+        ('relevance', ("well_supported", "partially_supported", "unsupported")),
+        ('coherence', ("coherent_and_clear", "mostly_coherent", "incoherent_or_unclear")),
+        ('business_context', ("correct", "incorrect")),
+        ('factual_accuracy', ("correct", "incorrect"))
+    )
+}
+
+# Safety metrics tagged as "safety:<prefix>_<judgment>" whenever the judgment is not "none"
+SAFETY_SEVERITY_TAGS = (
+    ('user_query', 'toxicity', 'user_toxicity'),
+    ('ai_response', 'jailbreak_success', 'ai_jailbreak'),
+    ('ai_response', 'toxicity', 'ai_toxicity')
+)
+
+# Evaluation dimensions as (summary name, path into rag_results, explanation key)
+EVALUATION_DIMENSIONS = (
+    ("accuracy", ('accuracy',), 'reasoning'),
+    ("relevance", ('relevance',), 'reasoning'),
+    ("coherence", ('coherence',), 'reasoning'),
+    ("safety_user_query_jailbreak", ('safety', 'user_query', 'jailbreak_attempt'), 'explanation'),
+    ("safety_user_query_toxicity", ('safety', 'user_query', 'toxicity'), 'explanation'),
+    ("safety_ai_response_jailbreak", ('safety', 'ai_response', 'jailbreak_success'), 'explanation'),
+    ("safety_ai_response_toxicity", ('safety', 'ai_response', 'toxicity'), 'explanation'),
+    ("business_context", ('business_context',), 'explanation'),
+    ("factual_accuracy", ('factual_accuracy',), 'explanation')
+)
+
+@lru_cache(maxsize=4096)
+def _iso_date(date_part: str) -> str:
+    """
+    Validate and normalize the date part (first 10 characters) of an ISO timestamp.
+    
+    Cached on the date alone, since many conversations share the same day.
+    
+    Args:
+        date_part: The YYYY-MM-DD prefix of an ISO 8601 timestamp
+        
+    Returns:
+        The date formatted as YYYY-MM-DD
+    """
+    return date.fromisoformat(date_part).isoformat()
+
+def _content_id(text: str) -> str:
+    """Return a short content hash used to reference large payloads from child spans."""
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+def summarize_evaluation(rag_results: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Flatten the evaluation results into per-dimension scores, judgments, and explanations.
+    
+    Args:
+        rag_results: Evaluation results as returned by the judge
+        
+    Returns:
+        Dictionary with 'scores', 'judgments', and 'explanations' keyed by dimension name
+    """
+    summary = {'scores': {}, 'judgments': {}, 'explanations': {}}
+    for name, path, explanation_key in EVALUATION_DIMENSIONS:
+        result = rag_results
+        for key in path:
+            result = result[key]
+        summary['scores'][name] = result['score']
+        summary['judgments'][name] = result['judgment']
+        summary['explanations'][name] = result[explanation_key]
+    return summary
+
+async def process_conversation(
+    conversation: Dict[str, Any],
+    args,
+    today: datetime,
+    eval_date: str,
+    judge_batcher: AsyncJudgeBatcher,
+    langfuse: Langfuse
+) -> Dict[str, Any]:
+    """
+    Evaluate a single conversation loaded from MongoDB.
+    
+    Creates a Langfuse trace, logs the stored chunks and answer, runs the judge
+    evaluation, and builds the MongoDB document for the results. Saving is left
+    to the caller so evaluations can be written in bulk.
+    
+    Args:
+        conversation: Conversation entry as returned by load_data_from_mongodb
+        args: Parsed command line arguments
+        today: Timestamp of the current evaluation run
+        eval_date: Date of the current evaluation run (YYYY-MM-DD)
+        judge_batcher: Shared batcher used for the judge calls
+        langfuse: Langfuse client used for tracing
+        
+    Returns:
+        Evaluation document to save to MongoDB
+    """
+    question = conversation['query']
+    created_at = conversation['created_at']
+    chunks = conversation['chunks']
+    answer = conversation['answer']
+    chat_id = conversation['chat_id']
+    user_id = conversation['user_id']
+    
+    logger.info("Processing question for chat %s (created at %s): %s", chat_id, created_at, question)
+    
+    # Retrieve business context for this user from MongoDB (cached per user)
+    business_context = await get_cached_business_context(user_id, args.guest)
+    if not business_context:
+        # Fall back to default business context if none found
+        logger.info("No business context found for user %s, using default", user_id)
+        business_context = DEFAULT_BUSINESS_CONTEXT
+    else:
+        logger.debug("Retrieved business context for user %s from MongoDB", user_id)
+    
+    # Create a single trace for the entire pipeline - ensure all data is traced
+    trace = langfuse.trace(
+        name="rag-evaluation",
+        user_id=user_id,
+        session_id=f"session_{chat_id}",
+        metadata={
+            "question": question,
+            "created_at": created_at,
+            "chat_id": chat_id,
+            "business_context": business_context,
+            "evaluation_date": today.isoformat(),
+            "day_of_week": today.strftime('%A'),
+            "date_filtered": not args.no_date_filter
+        },
+        input={
+            "question": question, 
+            "created_at": created_at,
+            "chat_id": chat_id,
+            "business_context": business_context
+        }
+    )
+    
+    # Since we already have chunks and answers from MongoDB, we'll skip retrieval and generation
+    # Just log the available chunks and answers
+    
+    # Log the chunks
+    # Child spans reference the question, chunks, and answer by content id; the full
+    # payloads are only sent once, on the trace itself
+    question_id = _content_id(question)
+    chunk_span = langfuse.span(
+        name="mongo-chunks",
+        trace_id=trace.id,
+        input={"question_id": question_id, "chat_id": chat_id}
+    )
+    
+    # Handle case where no chunks are available
+    if not chunks:
+        logger.info("No chunks available for chat %s", chat_id)
+        chunks = [NO_CHUNKS_PLACEHOLDER]
+        langfuse.score(
+            name="no-chunks-found",
+            trace_id=trace.id,
+            value=0,
+            comment="No chunks were available for this conversation"
+        )
+    
+    chunk_ids = [_content_id(chunk) for chunk in chunks]
+    chunk_span.update(output={"chunk_ids": chunk_ids, "count": len(chunks)})
+    chunk_span.end()  # Explicitly end the span
+    
+    logger.debug("Found %d chunks from MongoDB for chat %s", len(chunks), chat_id)
+    
+    # Log the answer
+    answer_span = langfuse.span(
+        name="mongo-answer",
+        trace_id=trace.id,
+        input={
+            "question_id": question_id,
+            "chat_id": chat_id,
+            "chunk_ids": chunk_ids
+        }
+    )
+    
+    logger.debug("Stored answer for chat %s:\n%s", chat_id, answer)
+    
+    # Log the generation in Langfuse (for historical record)
+    answer_id = _content_id(answer)
+    generation = langfuse.generation(
+        name="stored-answer",
+        trace_id=trace.id,
+        model="coach-service",
+        model_parameters={},
+        input={
+            "question_id": question_id,
+            "chunk_ids": chunk_ids
+        },
+        output={"answer_id": answer_id}
+    )
+    
+    answer_span.update(output={"answer_id": answer_id})
+    answer_span.end()  # Explicitly end the span
+    
+    # Step 3: Evaluate the answer using the RAG evaluation prompt
+    eval_span = langfuse.span(
+        name="rag-evaluation-wrapper",
+        trace_id=trace.id,
+        input={
+            "question_id": question_id,
+            "created_at": created_at,
+            "chunk_ids": chunk_ids,
+            "answer_id": answer_id
+        }
+    )
+    
+    # The judge call is queued on the shared batcher so that concurrent
+    # conversations are dispatched to OpenAI together
+    rag_results = await evaluate_using_rag_prompt_async(
+        question, 
+        chunks, 
+        answer, 
+        judge_batcher,
+        langfuse, 
+        trace.id
+    )
+    # The full results go on the trace output, so the span only records the scores
+    summary = summarize_evaluation(rag_results)
+    eval_span.update(output=summary['scores'])
+    eval_span.end()  # Explicitly end the span
+    
+    # Step 4: Log evaluation results for monitoring
+    logger.info(
+        "Evaluation results for chat %s:\n%s",
+        chat_id,
+        "\n".join(
+            f"  {name}: {summary['judgments'][name]} (score: {summary['scores'][name]})"
+            for name in summary['scores']
+        )
+    )
+    logger.debug(
+        "Evaluation explanations for chat %s:\n%s",
+        chat_id,
+        "\n".join(f"  {name}: {explanation}" for name, explanation in summary['explanations'].items())
+    )
+    
+    # Step 5: Create tags based on judgments for Langfuse filtering
+    # Add date tags for easier filtering in Langfuse
+    try:
+        # Extract just the date part of the ISO format timestamp, plus the evaluation date
+        date_tags = [f"date:{_iso_date(created_at[:10])}", f"eval_date:{eval_date}"]
+    except Exception as e:
+        logger.warning("Error creating date tags: %s", e)
+        date_tags = []
+    
+    safety = rag_results['safety']
+    tags = [
+        f"created_at:{created_at}",
+        *date_tags,
+        f"chat_id:{chat_id}",
+        # Judgment tags for each evaluation dimension
+        *(
+            tag
+            for dimension, dimension_tags in JUDGMENT_TAGS.items()
+            if (tag := dimension_tags.get(rag_results[dimension]['judgment']))
+        ),
+        # Safety tags
+        *(
+            ("safety:jailbreak_attempt",)
+            if safety['user_query']['jailbreak_attempt']['judgment'] == "attempt"
+            else ()
+        ),
+        *(
+            f"safety:{prefix}_{safety[source][metric]['judgment']}"
+            for source, metric, prefix in SAFETY_SEVERITY_TAGS
+            if safety[source][metric]['judgment'] != "none"
+        )
+    ]
+    
+    # Step 6: Update the Langfuse trace with all evaluation data
+    # Explanations are already part of rag_results, so only the per-dimension summary is added
+    await asyncio.to_thread(
+        trace.update,
+        tags=tags,
+        scores=summary['scores'],
+        metadata={
+            "question": question,
+            "created_at": created_at,
+            "chat_id": chat_id,
+            "business_context": business_context,
+            "evaluation_judgments": summary['judgments']
+        },
+        output={
+            "answer": answer,
+            "chunks": chunks,
+            "evaluation": rag_results
+        }
+    )
+    
+    # Flushing per question forces a synchronous round-trip to Langfuse, so it is
+    # only done when explicitly requested; otherwise we flush once per run
+    if LANGFUSE_FLUSH_EACH:
+        await asyncio.to_thread(wait_for_scores)
+        langfuse.flush()
+    
+    logger.info("Completed evaluation for chat %s", chat_id)
+    
+    # Step 7: Build the evaluation document that the caller saves to MongoDB
+    return build_evaluation_document(
+        rag_results,
+        chat_id,
+        conversation.get('message_id'),
+        conversation.get('aiResponseMessageid'),
+        args.guest,
+        query=question,
+        chunks=chunks,
+        answer=answer
+    )
+
+async def run_evaluation(args, today: datetime) -> None:
+    """
+    Run the RAG evaluation pipeline over the conversations stored in MongoDB.
+    
+    For each conversation from MongoDB:
+    1. Creates a Langfuse trace
+    2. Uses the stored query, chunks, and answer
+    3. Evaluates the answer
+    4. Logs all metrics and results to Langfuse
+    5. Saves the evaluation results to MongoDB in batches
+    
+    Args:
+        args: Parsed command line arguments
+        today: Timestamp of the current evaluation run
+    """
+    langfuse = get_langfuse_client()
+    
+    try:
+        await ensure_indexes(args.guest)
+        
+        # Stream conversations from MongoDB
+        conversations = iter_data_from_mongodb(
+            limit=args.limit, 
+            guest_mode=args.guest,
+            date_filter=not args.no_date_filter,  # Use date filter unless --no-date-filter is specified
+            start_date=args.start_date,  # Pass custom start date if provided
+            end_date=args.end_date      # Pass custom end date if provided
+        )
+        
+        # Process conversations concurrently as they arrive, bounded by a semaphore
+        # so we stay within the OpenAI rate limits and only hold a few in memory
+        semaphore = asyncio.Semaphore(args.max_concurrent)
+        eval_date = today.strftime('%Y-%m-%d')
+        judge_batcher = AsyncJudgeBatcher()
+        pending = set()
+        pending_docs = []
+        processed = 0
+        
+        async def save_pending_docs() -> None:
+            # Take the whole batch before awaiting so concurrent tasks start a new one
+            docs = pending_docs[:]
+            pending_docs.clear()
+            inserted_ids = await save_evaluations_to_mongodb(docs)
+            if len(inserted_ids) != len(docs):
+                logger.error("Failed to save %d of %d evaluations to MongoDB", len(docs) - len(inserted_ids), len(docs))
+        
+        async def process_with_release(conversation: Dict[str, Any]) -> None:
+            try:
+                pending_docs.append(
+                    await process_conversation(conversation, args, today, eval_date, judge_batcher, langfuse)
+                )
+                if len(pending_docs) >= EVALUATION_SAVE_BATCH_SIZE:
+                    await save_pending_docs()
+            except CacheMissError:
+                # A replay run must fail instead of skipping conversations
+                raise
+            except Exception as e:
+                # Report failures per conversation instead of aborting the whole run
+                logger.error("Error processing question '%s': %s", conversation['query'], e)
+            finally:
+                semaphore.release()
+        
+        try:
+            async for batch in batch_async_iterable(conversations, BUSINESS_CONTEXT_PREFETCH_SIZE):
+                # Fetch the business contexts of the batch's users in a single query
+                await prefetch_business_contexts(
+                    {conversation['user_id'] for conversation in batch},
+                    args.guest
+                )
+                
+                for conversation in batch:
+                    await semaphore.acquire()
+                    task = asyncio.create_task(process_with_release(conversation))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                    processed += 1
+            
+            await asyncio.gather(*pending)
+        finally:
+            # If the loop above failed, stop the conversations still in flight
+            # before their judge batcher and clients go away
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            await judge_batcher.close()
+            # Close the pooled judge connections while the event loop is still running
+            await close_async_clients()
+            # Save whatever is left of the last batch
+            if pending_docs:
+                await save_pending_docs()
+        
+        if not processed:
+            logger.warning("No data loaded from MongoDB. Please check your connection and try again.")
+            return
+        
+        # Send everything queued for this run to Langfuse in one go, including the
+        # judge scores still being handed over in the background
+        await asyncio.to_thread(wait_for_scores)
+        langfuse.flush()
+            
+    except CacheMissError:
+        await asyncio.to_thread(wait_for_scores)
+        langfuse.flush()
+        raise
+    except Exception as e:
+        logger.error("Error processing questions: %s", e)
+        await asyncio.to_thread(wait_for_scores)
+        langfuse.flush()  # Ensure any data is flushed before exiting
+    
+    logger.info("All questions processed. Check your Langfuse dashboard.")
@@ -6,9 +6,9 @@ for a given query.
 """
 
 from typing import List
-import requests
 
 from ..config.settings import SEARCH_API_URL
+from ..utils.http import get_http_session
 
 def get_chunks_from_api(question: str) -> List[str]:
     """
@@ -29,7 +29,7 @@ def get_chunks_from_api(question: str) -> List[str]:
     
     try:
         # Make the API request
-        response = requests.post(SEARCH_API_URL, json=payload)
+        response = get_http_session().post(SEARCH_API_URL, json=payload)
         response.raise_for_status()  # Raise exception for HTTP errors
         data = response.json()
         
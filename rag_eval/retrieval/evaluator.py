@@ -7,10 +7,13 @@ This module evaluates the performance of the retrieval component in the RAG syst
 import json
 import logging
 import requests
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
 import time
 
 from ..config.settings import SEARCH_API_URL
+from ..utils.helpers import fan_out, group_duplicates
+from ..utils.http import get_http_session
 
 logger = logging.getLogger(__name__)
 
@@ -18,36 +21,47 @@ def evaluate_retrieval(
     questions: List[str],
     conversation_ids: Optional[List[str]] = None,
     max_retries: int = 3,
-    retry_delay: float = 1.0
+    retry_delay: float = 1.0,
+    max_concurrent: int = 8
 ) -> List[Dict[str, Any]]:
     """
     Evaluate the retrieval performance for a list of questions.
     
+    The questions are evaluated concurrently on a thread pool; the API calls
+    share the pooled HTTP session, which keeps enough connections open for them.
+    
     Args:
         questions: List of questions to evaluate
         conversation_ids: Optional list of conversation IDs (same length as questions)
-        max_retries: Maximum number of retries for API calls
-        retry_delay: Delay between retries in seconds
+        max_retries: Maximum number of attempts for each API call
+        retry_delay: Backoff factor between attempts in seconds
+        max_concurrent: Maximum number of concurrent API calls
         
     Returns:
-        List of retrieval results with evaluation metrics
+        List of retrieval results with evaluation metrics, in the order of questions
     """
-    results = []
+    if not questions:
+        return []
     
-    for i, question in enumerate(questions):
-        conversation_id = conversation_ids[i] if conversation_ids and i < len(conversation_ids) else None
-        
+    # Evaluate each distinct (question, conversation ID) pair once, and give its
+    # duplicates copies of the result
+    unique_pairs, positions = group_duplicates([
+        (question, conversation_ids[i] if conversation_ids and i < len(conversation_ids) else None)
+        for i, question in enumerate(questions)
+    ])
+    
+    def evaluate(pair: Tuple[str, Optional[str]]) -> Dict[str, Any]:
         # Evaluate single question
-        result = evaluate_single_retrieval(
-            question=question,
-            conversation_id=conversation_id,
+        return evaluate_single_retrieval(
+            question=pair[0],
+            conversation_id=pair[1],
             max_retries=max_retries,
             retry_delay=retry_delay
         )
-        
-        results.append(result)
     
-    return results
+    with ThreadPoolExecutor(max_workers=min(max_concurrent, len(unique_pairs))) as executor:
+        results = list(executor.map(evaluate, unique_pairs))
+    return fan_out(results, positions, len(questions))
 
 def evaluate_single_retrieval(
     question: str,
@@ -61,8 +75,8 @@ def evaluate_single_retrieval(
     Args:
         question: Question to evaluate
         conversation_id: Optional conversation ID
-        max_retries: Maximum number of retries for API calls
-        retry_delay: Delay between retries in seconds
+        max_retries: Maximum number of attempts for the API call
+        retry_delay: Backoff factor between attempts in seconds
         
     Returns:
         Retrieval result with evaluation metrics
@@ -98,28 +112,24 @@ def evaluate_single_retrieval(
     if conversation_id:
         payload["conversation_id"] = conversation_id
     
-    # Call search API with retries
+    # Call search API; the session retries failed attempts with backoff
     start_time = time.time()
     success = False
     response = None
     error = None
     
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(
-                SEARCH_API_URL,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=30
-            )
-            response.raise_for_status()
-            success = True
-            break
-        except requests.exceptions.RequestException as e:
-            error = str(e)
-            logger.warning(f"Retrieval API call failed (attempt {attempt+1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay)
+    try:
+        response = get_http_session(max(max_retries - 1, 0), retry_delay).post(
+            SEARCH_API_URL,
+            json=payload,
+            headers={"Content-Type": "application/json"},
+            timeout=30
+        )
+        response.raise_for_status()
+        success = True
+    except requests.exceptions.RequestException as e:
+        error = str(e)
+        logger.warning(f"Retrieval API call failed after {max_retries} attempts: {e}")
     
     end_time = time.time()
     retrieval_time_ms = (end_time - start_time) * 1000
@@ -0,0 +1,107 @@
+"""
+Shared API clients for the RAG evaluation pipeline.
+
+Clients are created lazily on first use and reused afterwards, so importing a
+module never validates credentials or opens connection pools by itself.
+"""
+
+import importlib.util
+from functools import cache
+
+import httpx
+import openai
+from langfuse import Langfuse
+
+from ..config.settings import (
+    LANGFUSE_SECRET_KEY,
+    LANGFUSE_PUBLIC_KEY,
+    LANGFUSE_HOST,
+    LANGFUSE_FLUSH_AT,
+    LANGFUSE_FLUSH_INTERVAL,
+    OPENAI_API_KEY
+)
+from .helpers import enable_fast_langfuse_serialization
+from .http import close_async_http_session
+from .tracing import close_langfuse_sinks
+
+# Connection pool limits for the shared async HTTP client. Every connection may
+# be kept alive, so bursts of concurrent judge calls don't reconnect afterwards
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = HTTP_MAX_CONNECTIONS
+
+# Timeouts of the shared async HTTP client, in seconds; connecting should be quick,
+# while a judge completion can take a while to stream
+HTTP_TIMEOUT = 60.0
+HTTP_CONNECT_TIMEOUT = 10.0
+
+# HTTP/2 multiplexing needs the optional h2 package
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+@cache
+def get_langfuse_client() -> Langfuse:
+    """
+    Return the shared Langfuse client, creating it on first use.
+    
+    Its background sender uploads queued traces, spans and scores in batches of
+    up to LANGFUSE_FLUSH_AT events, so the per-evaluation scores share requests.
+    
+    Returns:
+        Langfuse client configured from the settings
+    """
+    # Serialize Langfuse events with orjson when available
+    enable_fast_langfuse_serialization()
+    
+    return Langfuse(
+        secret_key=LANGFUSE_SECRET_KEY,
+        public_key=LANGFUSE_PUBLIC_KEY,
+        host=LANGFUSE_HOST,
+        flush_at=LANGFUSE_FLUSH_AT,
+        flush_interval=LANGFUSE_FLUSH_INTERVAL
+    )
+
+@cache
+def get_openai_client() -> openai.OpenAI:
+    """
+    Return the shared synchronous OpenAI client, creating it on first use.
+    
+    Returns:
+        OpenAI client
+    """
+    return openai.OpenAI(api_key=OPENAI_API_KEY)
+
+@cache
+def get_async_openai_client() -> openai.AsyncOpenAI:
+    """
+    Return the shared asynchronous OpenAI client, creating it on first use.
+    
+    The client runs on a pooled httpx.AsyncClient that uses HTTP/2 when h2 is
+    installed, so concurrent judge calls share connections instead of each
+    paying for a TLS handshake.
+    
+    Returns:
+        Async OpenAI client
+    """
+    http_client = httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS
+        ),
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    )
+    return openai.AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=http_client)
+
+async def close_async_clients() -> None:
+    """
+    Close the shared asynchronous OpenAI client and aiohttp session, if they were
+    created, and the background Langfuse sinks.
+    
+    Their connections and worker tasks belong to the running event loop, so this
+    should be awaited before the loop shuts down. A later get_async_openai_client()
+    or get_async_http_session() call creates a new client on the loop running then.
+    """
+    await close_langfuse_sinks()
+    await close_async_http_session()
+    if get_async_openai_client.cache_info().currsize:
+        await get_async_openai_client().close()
+        get_async_openai_client.cache_clear()
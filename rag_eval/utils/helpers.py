@@ -3,11 +3,22 @@ Helper utility functions for the RAG evaluation pipeline.
 """
 
 import os
+import sys
+import copy
 import json
+import queue
+import types
 import logging
-from typing import Dict, List, Any, Union, Optional
+import logging.handlers
+from functools import lru_cache
+from typing import AsyncIterable, AsyncIterator, Dict, Hashable, List, Any, Sequence, Tuple, Union, Optional
 import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 def safe_serialize(obj: Any) -> Any:
@@ -36,7 +47,22 @@ def save_json(data: Dict[str, Any], filepath: str, pretty: bool = True) -> None:
         pretty: Whether to format the JSON with indentation
     """
     try:
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        _ensure_dir(os.path.dirname(filepath))
+        if orjson is not None:
+            # orjson encodes the whole document in C and it is written in one go
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            if pretty:
+                option |= orjson.OPT_INDENT_2
+            try:
+                encoded = orjson.dumps(data, default=safe_serialize, option=option)
+            except TypeError:
+                # e.g. integers beyond 64 bits, which only the json module handles
+                encoded = None
+            if encoded is not None:
+                _write_bytes(filepath, encoded)
+                logger.debug(f"Data saved to {filepath}")
+                return
+        
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2 if pretty else None, default=safe_serialize)
         logger.debug(f"Data saved to {filepath}")
@@ -44,6 +70,17 @@ def save_json(data: Dict[str, Any], filepath: str, pretty: bool = True) -> None:
         logger.error(f"Error saving JSON to {filepath}: {e}")
         raise
 
+def _write_bytes(filepath: str, data: bytes) -> None:
+    """Write bytes to a file straight through its descriptor, without a buffered file object."""
+    fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            # os.write may write less than asked for, e.g. when interrupted
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
 def load_json(filepath: str) -> Dict[str, Any]:
     """
     Load data from a JSON file.
@@ -55,22 +92,88 @@ def load_json(filepath: str) -> Dict[str, Any]:
         Loaded data
     """
     try:
+        if orjson is not None:
+            with open(filepath, 'rb') as f:
+                return orjson.loads(f.read())
         with open(filepath, 'r', encoding='utf-8') as f:
             return json.load(f)
     except Exception as e:
         logger.error(f"Error loading JSON from {filepath}: {e}")
         raise
 
+def fast_json_dumps(obj: Any) -> str:
+    """
+    Serialize an object to a compact JSON string, with orjson when it is installed.
+    
+    Suitable as aiohttp's json_serialize for request bodies.
+    
+    Args:
+        obj: Object to serialize
+        
+    Returns:
+        JSON string
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=safe_serialize).decode()
+        except TypeError:
+            pass
+    return json.dumps(obj, default=safe_serialize)
+
+@lru_cache(maxsize=64)
+def _ensure_dir(directory: str) -> None:
+    """Create a directory once per process; an empty path means the working directory."""
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory, exist_ok=True)
+        logger.debug(f"Created directory: {directory}")
+
+def group_duplicates(keys: Sequence[Hashable]) -> Tuple[List[Hashable], List[List[int]]]:
+    """
+    Group the positions of equal keys, so each distinct key is processed once.
+    
+    Args:
+        keys: Keys identifying the work items, e.g. argument tuples
+        
+    Returns:
+        The distinct keys in order of first appearance, and for each of them the
+        positions where it occurs in keys
+    """
+    positions: Dict[Hashable, List[int]] = {}
+    for i, key in enumerate(keys):
+        positions.setdefault(key, []).append(i)
+    return list(positions), list(positions.values())
+
+def fan_out(results: Sequence[Dict[str, Any]], positions: Sequence[List[int]], total: int) -> List[Dict[str, Any]]:
+    """
+    Spread the results of distinct keys back over all positions they occurred at.
+    
+    Repeated occurrences get copies, so results can be modified independently.
+    
+    Args:
+        results: One result per distinct key, as returned by group_duplicates
+        positions: Positions of each distinct key, as returned by group_duplicates
+        total: Number of keys originally passed to group_duplicates
+        
+    Returns:
+        One result per original key, in the original order
+    """
+    fanned: List[Optional[Dict[str, Any]]] = [None] * total
+    for result, indices in zip(results, positions):
+        fanned[indices[0]] = result
+        for i in indices[1:]:
+            fanned[i] = copy.deepcopy(result)
+    return fanned
+
 def ensure_dir(directory: str) -> None:
     """
     Ensure a directory exists, creating it if necessary.
     
+    Directories already ensured by this process aren't checked again.
+    
     Args:
         directory: Directory path
     """
-    if not os.path.exists(directory):
-        os.makedirs(directory, exist_ok=True)
-        logger.debug(f"Created directory: {directory}")
+    _ensure_dir(directory)
 
 def format_duration(seconds: float) -> str:
     """
@@ -89,4 +192,91 @@ def format_duration(seconds: float) -> str:
         return f"{minutes:.1f} minutes"
     else:
         hours = seconds / 3600
-        return f"{hours:.1f} hours" 
\ No newline at end of file
+        return f"{hours:.1f} hours"
+
+def enable_fast_langfuse_serialization() -> bool:
+    """
+    Make the Langfuse SDK serialize its events with orjson when it is installed.
+    
+    Only the json module references inside the Langfuse SDK are swapped, so the
+    stdlib json module is left untouched for the rest of the process. Payloads
+    orjson cannot encode fall back to the SDK's own encoder.
+    
+    Returns:
+        True if orjson serialization was enabled, False otherwise
+    """
+    try:
+        import orjson
+        from langfuse import request as langfuse_request
+        from langfuse import task_manager as langfuse_task_manager
+    except ImportError:
+        return False
+    
+    def dumps(obj: Any, cls: Optional[type] = None, **kwargs) -> str:
+        try:
+            return orjson.dumps(
+                obj,
+                default=cls().default if cls else None,
+                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            ).decode()
+        except TypeError:
+            return json.dumps(obj, cls=cls, **kwargs)
+    
+    # Namespace mirroring the json module with a faster dumps
+    fast_json = types.SimpleNamespace(**{name: getattr(json, name) for name in json.__all__})
+    fast_json.dumps = dumps
+    
+    for module in (langfuse_request, langfuse_task_manager):
+        if getattr(module, "json", None) is json:
+            module.json = fast_json
+    
+    logger.debug("Langfuse serialization switched to orjson")
+    return True
+
+def setup_queue_logging(level: int = logging.INFO, logger_name: str = "rag_eval") -> logging.handlers.QueueListener:
+    """
+    Route the pipeline's log records through a queue to a background writer thread.
+    
+    Log calls only enqueue the record, so the event loop never blocks on stdout
+    writes. Call stop() on the returned listener to flush remaining records on exit.
+    
+    Args:
+        level: Logging level for the pipeline logger
+        logger_name: Name of the logger to configure
+        
+    Returns:
+        The started queue listener
+    """
+    log_queue = queue.SimpleQueue()
+    
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    
+    pipeline_logger = logging.getLogger(logger_name)
+    pipeline_logger.setLevel(level)
+    pipeline_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    pipeline_logger.propagate = False
+    
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+async def batch_async_iterable(iterable: AsyncIterable[Any], size: int) -> AsyncIterator[List[Any]]:
+    """
+    Group the items of an async iterable into lists of at most size items.
+    
+    Args:
+        iterable: Async iterable to consume
+        size: Maximum number of items per batch
+        
+    Yields:
+        Lists of consecutive items
+    """
+    batch = []
+    async for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
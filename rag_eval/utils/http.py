@@ -0,0 +1,101 @@
+"""
+Shared HTTP sessions for the RAG evaluation pipeline.
+
+Calls to the search and coach service APIs go through one pooled
+requests.Session (or aiohttp.ClientSession for async code), so consecutive
+requests reuse open connections instead of paying for a new TCP and TLS
+handshake each time.
+"""
+
+from functools import cache
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .helpers import fast_json_dumps
+
+# Connection pool sizes: number of hosts kept in the pool, and connections per host
+HTTP_POOL_CONNECTIONS = 32
+HTTP_POOL_MAXSIZE = 64
+
+# Default retries of a failed request, with exponential backoff starting at
+# HTTP_RETRY_BACKOFF seconds
+HTTP_MAX_RETRIES = 2
+HTTP_RETRY_BACKOFF = 1.0
+
+# Timeouts of the async session in seconds, for connecting and for each read;
+# there is no total timeout, so long answer streams aren't cut off
+ASYNC_HTTP_CONNECT_TIMEOUT = 10
+ASYNC_HTTP_READ_TIMEOUT = 60
+
+# Seconds the async session caches DNS lookups
+ASYNC_HTTP_DNS_CACHE_TTL = 300
+
+# Response statuses worth retrying
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+@cache
+def get_http_session(max_retries: int = HTTP_MAX_RETRIES, backoff: float = HTTP_RETRY_BACKOFF) -> requests.Session:
+    """
+    Return a shared HTTP session with the given retry policy, creating it on first use.
+    
+    Connection errors and the statuses in HTTP_RETRY_STATUSES are retried by
+    urllib3, for POST requests too since the APIs called here don't change state.
+    Once the retries are used up, the last response is returned as is.
+    
+    Args:
+        max_retries: Number of retries after the first attempt
+        backoff: Backoff factor between retries in seconds
+    
+    Returns:
+        Pooled requests session
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff,
+        status_forcelist=HTTP_RETRY_STATUSES,
+        allowed_methods=None,  # Retry every method, including POST
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry
+    )
+    
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@cache
+def get_async_http_session() -> aiohttp.ClientSession:
+    """
+    Return the shared aiohttp session, creating it on first use.
+    
+    Must be called from a running event loop, and the session is bound to it;
+    close_async_http_session(), which close_async_clients() calls, closes it
+    before the loop shuts down.
+    
+    Returns:
+        Pooled aiohttp session
+    """
+    connector = aiohttp.TCPConnector(limit=HTTP_POOL_MAXSIZE, ttl_dns_cache=ASYNC_HTTP_DNS_CACHE_TTL)
+    timeout = aiohttp.ClientTimeout(
+        total=None,
+        sock_connect=ASYNC_HTTP_CONNECT_TIMEOUT,
+        sock_read=ASYNC_HTTP_READ_TIMEOUT
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, json_serialize=fast_json_dumps)
+
+async def close_async_http_session() -> None:
+    """
+    Close the shared aiohttp session, if it was created.
+    
+    A later get_async_http_session() call creates a new session.
+    """
+    if get_async_http_session.cache_info().currsize:
+        await get_async_http_session().close()
+        get_async_http_session.cache_clear()
@@ -0,0 +1,67 @@
+"""
+Rate limiting for the RAG evaluation pipeline.
+
+Provides a token bucket that keeps concurrent API calls within the
+requests-per-minute and tokens-per-minute budgets of the OpenAI account.
+"""
+
+import time
+import asyncio
+
+class TokenBucket:
+    """
+    Async token bucket enforcing both a request and a token budget per minute.
+    
+    Both buckets start full and refill continuously at rpm/60 requests and
+    tpm/60 tokens per second. Callers that can't be served yet wait in FIFO order
+    until enough budget has accumulated, instead of running into 429 responses.
+    """
+    
+    def __init__(self, rpm: int, tpm: int):
+        """
+        Initialize the token bucket.
+        
+        Args:
+            rpm: Requests allowed per minute
+            tpm: Tokens allowed per minute
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self.request_tokens = float(rpm)
+        self.token_tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        """Add the budget accumulated since the last refill, capped at one minute's worth."""
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self.request_tokens = min(self.rpm, self.request_tokens + elapsed * self.rpm / 60)
+        self.token_tokens = min(self.tpm, self.token_tokens + elapsed * self.tpm / 60)
+    
+    async def acquire(self, estimated_tokens: int) -> None:
+        """
+        Wait until one request and estimated_tokens tokens are available and take them.
+        
+        Args:
+            estimated_tokens: Tokens the request is expected to consume (prompt and completion)
+        """
+        # A request larger than the whole per-minute budget could never be served
+        estimated_tokens = min(estimated_tokens, self.tpm)
+        
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.request_tokens >= 1 and self.token_tokens >= estimated_tokens:
+                    self.request_tokens -= 1
+                    self.token_tokens -= estimated_tokens
+                    return
+                
+                # Sleep until the scarcer of the two budgets has refilled enough
+                wait_time = max(
+                    (1 - self.request_tokens) * 60 / self.rpm,
+                    (estimated_tokens - self.token_tokens) * 60 / self.tpm,
+                    0
+                )
+                await asyncio.sleep(wait_time)
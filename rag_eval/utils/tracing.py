@@ -0,0 +1,175 @@
+"""
+Background Langfuse logging for the RAG evaluation pipeline.
+
+Spans and generations are queued on an AsyncLangfuseSink and handed to the
+Langfuse SDK by a worker task in batches, off the event loop, so evaluations
+never wait on the telemetry backend.
+"""
+
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from langfuse import Langfuse
+
+from ..config.settings import LANGFUSE_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+# The worker hands queued events to Langfuse once this many are waiting, or when
+# SINK_FLUSH_INTERVAL seconds have passed since the first one was queued
+SINK_BATCH_SIZE = 100
+SINK_FLUSH_INTERVAL = 1.0
+
+# Seconds close_langfuse_sinks() waits for queued events by default
+SINK_CLOSE_TIMEOUT = 5.0
+
+class AsyncLangfuseSink:
+    """
+    Queue of Langfuse spans and generations sent by a background worker task.
+    
+    Events are recorded complete, with their input, output and start and end
+    times, so nothing has to be updated after it was queued. The worker is
+    started on the first enqueue() and belongs to the running event loop.
+    """
+    
+    def __init__(self, langfuse: Langfuse, batch_size: int = SINK_BATCH_SIZE,
+                 flush_interval: float = SINK_FLUSH_INTERVAL):
+        """
+        Initialize the sink.
+        
+        Args:
+            langfuse: Langfuse client the events are sent to
+            batch_size: Maximum number of events handed to Langfuse at once
+            flush_interval: Maximum seconds an event waits in the queue
+        """
+        self.langfuse = langfuse
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+    
+    def enqueue(self, kind: str, **fields: Any) -> None:
+        """
+        Queue a Langfuse event without waiting for it to be sent.
+        
+        Args:
+            kind: Langfuse client method creating the event, "span" or "generation"
+            **fields: Keyword arguments for that method
+        """
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        self._queue.put_nowait((kind, fields))
+    
+    async def _next_batch(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Wait for the next event, then collect more until the batch is full or the interval ends."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.flush_interval
+        
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def _run(self) -> None:
+        """Hand queued events to Langfuse in batches until cancelled."""
+        while True:
+            batch = await self._next_batch()
+            try:
+                await asyncio.to_thread(self._send, batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    def _send(self, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Create the queued events with the Langfuse client."""
+        for kind, fields in batch:
+            try:
+                getattr(self.langfuse, kind)(**fields)
+            except Exception as e:
+                # A lost event only affects the trace, not the evaluation
+                logger.error("Error logging Langfuse %s: %s", kind, e)
+    
+    async def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        Wait until every queued event has been handed to Langfuse.
+        
+        Args:
+            timeout: Maximum seconds to wait, or None to wait for all events
+        """
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Gave up on %d queued Langfuse events after %ss", self._queue.qsize(), timeout)
+    
+    async def close(self, timeout: Optional[float] = SINK_CLOSE_TIMEOUT) -> None:
+        """
+        Flush the queued events and stop the worker.
+        
+        Args:
+            timeout: Maximum seconds to wait for queued events
+        """
+        await self.flush(timeout)
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+def is_trace_sampled(trace_id: str, sample_rate: float = LANGFUSE_SAMPLE_RATE) -> bool:
+    """
+    Decide whether a trace's events are logged, the same way for every call.
+    
+    The trace ID is hashed to a number in [0, 1), so all spans of a trace share
+    the decision, across calls and runs.
+    
+    Args:
+        trace_id: Langfuse trace ID
+        sample_rate: Fraction of traces to log
+    
+    Returns:
+        Whether events of this trace should be logged
+    """
+    if sample_rate >= 1:
+        return True
+    digest = hashlib.blake2b(trace_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64 < sample_rate
+
+# Sinks created by get_langfuse_sink, one per Langfuse client
+_sinks: Dict[Langfuse, AsyncLangfuseSink] = {}
+
+def get_langfuse_sink(langfuse: Langfuse) -> AsyncLangfuseSink:
+    """
+    Return the sink for a Langfuse client, creating it on first use.
+    
+    Args:
+        langfuse: Langfuse client the events are sent to
+    
+    Returns:
+        Sink shared by all callers logging to that client
+    """
+    if langfuse not in _sinks:
+        _sinks[langfuse] = AsyncLangfuseSink(langfuse)
+    return _sinks[langfuse]
+
+async def close_langfuse_sinks(timeout: Optional[float] = SINK_CLOSE_TIMEOUT) -> None:
+    """
+    Flush and close every sink, so queued events reach the Langfuse clients.
+    
+    Should be awaited before the event loop shuts down and before the clients
+    themselves are flushed.
+    
+    Args:
+        timeout: Maximum seconds to wait for each sink's queued events
+    """
+    for sink in list(_sinks.values()):
+        await sink.close(timeout)
+    _sinks.clear()